@@ -0,0 +1,14 @@
+"""
+ASGI config for alx_backend_graphql project.
+
+Serve with an ASGI server, e.g. `uvicorn alx_backend_graphql.asgi:application`,
+and set CRM_ASYNC_GRAPHQL = True so /graphql uses the async view.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_backend_graphql.settings')
+
+application = get_asgi_application()
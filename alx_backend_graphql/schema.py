@@ -1,7 +1,5 @@
 import graphene
-
-class CRMQuery(graphene.ObjectType):
-    pass
+from crm.schema import Mutation as CRMMutation, Query as CRMQuery
 
 class Query(CRMQuery, graphene.ObjectType):
     hello = graphene.String()
@@ -9,4 +7,7 @@ class Query(CRMQuery, graphene.ObjectType):
     def resolve_hello(self, info):
         return "Hello, GraphQL!"
 
-schema = graphene.Schema(query=Query)
+class Mutation(CRMMutation, graphene.ObjectType):
+    pass
+
+schema = graphene.Schema(query=Query, mutation=Mutation)
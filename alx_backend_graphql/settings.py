@@ -44,7 +44,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'alx_backend_graphql_crm.urls'
+ROOT_URLCONF = 'alx_backend_graphql.urls'
 
 TEMPLATES = [
     {
@@ -62,16 +62,41 @@ TEMPLATES = [
     },
 ]
 
-WSGI_APPLICATION = 'alx_backend_graphql_crm.wsgi.application'
+WSGI_APPLICATION = 'alx_backend_graphql.wsgi.application'
+ASGI_APPLICATION = 'alx_backend_graphql.asgi.application'
+
+# Serve /graphql with the async view; turn on when running under ASGI
+CRM_ASYNC_GRAPHQL = False
 
 # Database
+# `default` is the primary. GraphQL queries and report jobs read from the
+# CRM_DATABASE_REPLICAS that are healthy (crm.tasks.check_database_replicas
+# probes them); writes, and a client's reads for CRM_READ_YOUR_WRITES_SECONDS
+# after a mutation, go to the primary. Results read from a replica are cached
+# for at most CRM_REPLICA_CACHE_TTL seconds, so rows a lagging replica served
+# after a write don't outlive the lag. Locally the replica is a second
+# connection to db.sqlite3, a replica with no lag; point NAME at a copy of it
+# to see the routing. In tests it is a separate database, so the tests can
+# tell which one a read went to.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'NAME': BASE_DIR / 'test_db_replica.sqlite3'},
+    },
 }
 
+DATABASE_ROUTERS = ['crm.routers.ReplicaRouter']
+CRM_DATABASE_REPLICAS = ['replica']
+CRM_REPLICA_RETRY_SECONDS = 60
+CRM_READ_YOUR_WRITES_SECONDS = 5
+CRM_READ_YOUR_WRITES_COOKIE = 'crm_primary_until'
+CRM_REPLICA_CACHE_TTL = CRM_READ_YOUR_WRITES_SECONDS
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -98,9 +123,72 @@ USE_TZ = True
 STATIC_URL = 'static/'
 
 # Default primary key field type
-DEFAULT_AUTO_FIELD = 'django.db.backends.models.BigAutoField'
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # GraphQL Configuration
 GRAPHENE = {
-    "SCHEMA": "alx_backend_graphql_crm.schema.schema"
+    "SCHEMA": "alx_backend_graphql.schema.schema",
+    "MIDDLEWARE": ["crm.tracing.TracingMiddleware"],
 }
+
+# Caches
+# `graphql_responses` backs the CRM GraphQL response cache. Local memory is
+# per process; switch it to Redis/Memcached to share entries between workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'graphql_responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'graphql-responses',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+CRM_RESPONSE_CACHE_ALIAS = 'graphql_responses'
+CRM_RESPONSE_CACHE_TTL = 30
+
+# GraphQL query cost analysis (see crm/cost.py). Operations deeper than
+# CRM_QUERY_MAX_DEPTH or costlier than CRM_QUERY_COST_LIMIT are rejected
+# before they run; CRM_QUERY_COST_RATE caps the cost a client may spend
+# per minute (None disables throttling).
+CRM_QUERY_COST_LIMIT = 20000
+CRM_QUERY_MAX_DEPTH = 10
+CRM_QUERY_COST_RATE = None
+CRM_QUERY_COST_WEIGHTS = {}
+
+# Batched GraphQL requests (a JSON array of operations in one POST)
+CRM_GRAPHQL_BATCH_MAX_SIZE = 10
+CRM_GRAPHQL_BATCH_COST_LIMIT = CRM_QUERY_COST_LIMIT
+
+# GraphQL tracing (see crm/tracing.py). Every operation is timed; this share
+# of them also records SQL and per-resolver timings for /metrics, and with
+# CRM_TRACING_IN_RESPONSE the trace is returned in extensions.tracing.
+CRM_TRACING_SAMPLE_RATE = 0.1
+CRM_TRACING_IN_RESPONSE = DEBUG
+
+# GraphQL client of the cron jobs and Celery tasks (see crm/jobs.py).
+# Operations run against the in-process schema unless CRM_JOB_GRAPHQL_URL
+# names an endpoint; over HTTP the introspected schema is kept on disk.
+CRM_JOB_GRAPHQL_URL = None
+CRM_JOB_SCHEMA_CACHE = '/tmp/crm_graphql_schema.json'
+CRM_JOB_SCHEMA_MAX_AGE = 24 * 60 * 60
+
+# Per-customer/per-product report (crm.tasks.generate_crm_breakdown_report).
+# The Order ID range is split into at most CRM_REPORT_PARALLELISM subtasks
+# that each aggregate CRM_REPORT_CHUNK_SIZE IDs per query; a reducer merges
+# them into CRM_REPORT_PATH. With CELERY_TASK_ALWAYS_EAGER = True the whole
+# chord runs in the calling process.
+CRM_REPORT_CHUNK_SIZE = 50000
+CRM_REPORT_PARALLELISM = 4
+CRM_REPORT_TOP = 10
+CRM_REPORT_PATH = '/tmp/crm_breakdown_report.json'
+
+# Largest salesTimeseries answer, in buckets; every bucket in the range is
+# returned, so this bounds the work of one call
+CRM_TIMESERIES_MAX_BUCKETS = 1000
+
+# Incremental jobs (order reminders, the sales rollup) only move their
+# watermark past orders inserted at least this long ago: longer than any
+# transaction that writes orders stays open
+CRM_WATERMARK_SETTLE_SECONDS = 60
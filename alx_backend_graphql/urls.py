@@ -1 +1,17 @@
+from django.conf import settings
+from django.contrib import admin
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 
+from alx_backend_graphql.schema import schema
+from crm.views import AsyncCRMGraphQLView, CRMGraphQLView, export_orders_view, metrics
+
+# The async view only pays off under ASGI (alx_backend_graphql/asgi.py)
+GraphQLView = AsyncCRMGraphQLView if getattr(settings, 'CRM_ASYNC_GRAPHQL', False) else CRMGraphQLView
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('graphql', csrf_exempt(GraphQLView.as_view(graphiql=True, schema=schema))),
+    path('metrics', metrics),
+    path('orders/export', export_orders_view),
+]
@@ -0,0 +1,28 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+
+
+def is_async(info):
+    """
+    True while the operation is executed by AsyncCRMGraphQLView. Resolvers
+    then must not touch the database from the event loop thread.
+    """
+    return getattr(info.context, 'crm_async', False)
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+def sync_resolver(resolver):
+    """
+    For resolvers that need the sync ORM (transactions, raw SQL): under the
+    async view the whole resolver runs in Django's sync thread
+    """
+    @wraps(resolver)
+    def wrapper(root, info, *args, **kwargs):
+        if is_async(info):
+            return sync_to_async(resolver)(root, info, *args, **kwargs)
+        return resolver(root, info, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class CrmConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'crm'
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
+        from . import tracing  # noqa: F401
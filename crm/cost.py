@@ -0,0 +1,203 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError,
+    OperationType, get_named_type, get_nullable_type, is_list_type,
+)
+from graphql.execution.values import get_argument_values
+
+COST_RATE_CACHE_PREFIX = 'crm:query-cost:'
+
+
+class QueryCostError(GraphQLError):
+    def __init__(self, message, code, cost):
+        super().__init__(message, extensions={'code': code, 'cost': cost})
+
+
+def is_connection(graphql_type):
+    fields = getattr(graphql_type, 'fields', {})
+    return 'edges' in fields and 'pageInfo' in fields
+
+
+def is_edge(graphql_type):
+    fields = getattr(graphql_type, 'fields', {})
+    return 'node' in fields and 'cursor' in fields
+
+
+class QueryCost:
+    """
+    Static cost of one operation, computed from the document before it runs.
+
+    Every object the operation can return counts 1, plus the weight of the
+    field that returns it (CRM_QUERY_COST_WEIGHTS, keyed 'Type.field';
+    object fields default to 1 and scalars to 0). A connection multiplies
+    the cost of its nodes by its `first`/`last` argument, or by
+    RELAY_CONNECTION_MAX_LIMIT when neither is given, and a plain list by
+    CRM_QUERY_COST_LIST_SIZE. The edges/node/pageInfo wrappers of a
+    connection are free and don't add depth.
+    """
+
+    def __init__(self, schema, document, operation, variables=None):
+        self.schema = schema
+        self.operation = operation
+        self.variables = variables or {}
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        self.weights = getattr(settings, 'CRM_QUERY_COST_WEIGHTS', {})
+        self.list_size = getattr(settings, 'CRM_QUERY_COST_LIST_SIZE', 100)
+        self.page_size = graphene_settings.RELAY_CONNECTION_MAX_LIMIT or 100
+
+    def root_type(self):
+        return {
+            OperationType.QUERY: self.schema.query_type,
+            OperationType.MUTATION: self.schema.mutation_type,
+            OperationType.SUBSCRIPTION: self.schema.subscription_type,
+        }[self.operation.operation]
+
+    def compute(self):
+        """
+        Return (cost, depth)
+        """
+        return self.selection_cost(self.root_type(), self.operation.selection_set, 0)
+
+    def selection_cost(self, parent_type, selection_set, depth):
+        cost, max_depth = 0, depth
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self.field_cost(parent_type, selection, depth)
+            else:
+                if isinstance(selection, FragmentSpreadNode):
+                    selection = self.fragments[selection.name.value]
+                type_condition = selection.type_condition
+                fragment_type = (
+                    self.schema.get_type(type_condition.name.value) if type_condition else parent_type
+                )
+                # Both branches of a type condition count, as an upper bound
+                field_cost, field_depth = self.selection_cost(
+                    fragment_type, selection.selection_set, depth
+                )
+            cost += field_cost
+            max_depth = max(max_depth, field_depth)
+        return cost, max_depth
+
+    def field_cost(self, parent_type, node, depth):
+        name = node.name.value
+        field = getattr(parent_type, 'fields', {}).get(name)
+        if field is None or name.startswith('__'):
+            # Introspection (and fields of unions) cost nothing
+            return 0, depth
+
+        if node.selection_set is None:
+            return self.weights.get(f'{parent_type.name}.{name}', 0), depth
+
+        field_type = get_named_type(field.type)
+        if (is_connection(parent_type) and name in ('edges', 'pageInfo')) or (
+            is_edge(parent_type) and name == 'node'
+        ):
+            return self.selection_cost(field_type, node.selection_set, depth)
+
+        children, child_depth = self.selection_cost(field_type, node.selection_set, depth + 1)
+        weight = self.weights.get(f'{parent_type.name}.{name}', 1)
+        return weight + self.multiplier(field, node) * (1 + children), child_depth
+
+    def multiplier(self, field, node):
+        if is_connection(get_named_type(field.type)):
+            try:
+                args = get_argument_values(field, node, self.variables)
+            except GraphQLError:
+                args = {}
+            requested = args.get('first') or args.get('last')
+            return requested if isinstance(requested, int) and requested > 0 else self.page_size
+        if is_list_type(get_nullable_type(field.type)):
+            return self.list_size
+        return 1
+
+
+def client_id(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def charge(request, cost):
+    """
+    Spend `cost` from the client's budget for the current minute
+    (CRM_QUERY_COST_RATE, off when unset). Returns the remaining budget,
+    or raises QueryCostError when the operation doesn't fit.
+    """
+    rate = getattr(settings, 'CRM_QUERY_COST_RATE', None)
+    if not rate:
+        return None
+    window = int(time.time() // 60)
+    key = f'{COST_RATE_CACHE_PREFIX}{client_id(request)}:{window}'
+    cache.add(key, 0, timeout=120)
+    spent = cache.incr(key, cost)
+    if spent > rate:
+        # A rejected operation doesn't use up the budget
+        cache.decr(key, cost)
+        raise QueryCostError(
+            f"Query cost budget of {rate} per minute exhausted, retry in "
+            f"{60 - int(time.time()) % 60}s",
+            'QUERY_COST_THROTTLED', cost,
+        )
+    return rate - spent
+
+
+def charge_batch(request, cost):
+    """
+    Add an operation of a batched request to the batch total. Returns what
+    is left of CRM_GRAPHQL_BATCH_COST_LIMIT, or raises QueryCostError when
+    the operation doesn't fit. Outside a batch returns None.
+    """
+    spent = getattr(request, 'crm_batch_cost', None)
+    if spent is None:
+        return None
+    limit = getattr(settings, 'CRM_GRAPHQL_BATCH_COST_LIMIT', 20000)
+    if spent + cost > limit:
+        raise QueryCostError(
+            f"Batch cost {spent + cost} exceeds the maximum batch cost of {limit}",
+            'BATCH_TOO_COSTLY', cost,
+        )
+    request.crm_batch_cost = spent + cost
+    return limit - request.crm_batch_cost
+
+
+def check_cost(request, schema, document, operation, variables):
+    """
+    Score an operation and reject it when it is deeper than
+    CRM_QUERY_MAX_DEPTH (default 10), costs more than CRM_QUERY_COST_LIMIT
+    (default 20000), doesn't fit in the rest of its batch's cost limit or
+    exceeds the client's per-minute budget.
+    Returns the cost report for the response `extensions`.
+    """
+    cost, depth = QueryCost(schema, document, operation, variables).compute()
+    limit = getattr(settings, 'CRM_QUERY_COST_LIMIT', 20000)
+    max_depth = getattr(settings, 'CRM_QUERY_MAX_DEPTH', 10)
+    if depth > max_depth:
+        raise QueryCostError(
+            f"Query depth {depth} exceeds the maximum depth of {max_depth}", 'QUERY_TOO_DEEP', cost
+        )
+    if cost > limit:
+        raise QueryCostError(
+            f"Query cost {cost} exceeds the maximum cost of {limit}", 'QUERY_TOO_COSTLY', cost
+        )
+    report = {'requestedQueryCost': cost, 'maximumAvailable': limit, 'depth': depth}
+    batch_remaining = charge_batch(request, cost)
+    if batch_remaining is not None:
+        report['batchRemaining'] = batch_remaining
+    try:
+        remaining = charge(request, cost)
+    except QueryCostError:
+        if batch_remaining is not None:
+            request.crm_batch_cost -= cost
+        raise
+    if remaining is not None:
+        report['throttleRemaining'] = remaining
+    return report
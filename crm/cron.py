@@ -1,6 +1,6 @@
 from datetime import datetime
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+
+from crm.jobs import get_job_client
 
 def log_crm_heartbeat():
     """
@@ -18,24 +18,16 @@ def log_crm_heartbeat():
         
         # Optional: Verify GraphQL endpoint is responsive using gql
         try:
-            # Set up GraphQL transport and client
-            transport = RequestsHTTPTransport(
-                url="http://localhost:8000/graphql",
-                verify=True,
-                retries=3,
-            )
-            
-            client = Client(transport=transport, fetch_schema_from_transport=True)
+            # This job checks the endpoint itself, so it goes over HTTP
+            client = get_job_client(http=True)
             
             # Query the GraphQL hello field to verify endpoint responsiveness
-            query = gql("""
+            result = client.execute("""
                 query {
                     hello
                 }
             """)
             
-            result = client.execute(query)
-            
             if 'hello' in result:
                 with open('/tmp/crm_heartbeat_log.txt', 'a') as log_file:
                     log_file.write(f"{timestamp} GraphQL endpoint is responsive: {result['hello']}\n")
@@ -51,26 +43,16 @@ def log_crm_heartbeat():
         # If file writing fails, this will be visible in cron logs
         print(f"Heartbeat logging failed: {e}")
 
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
-from datetime import datetime
-
 def update_low_stock():
     """
     Cron job function that runs every 12 hours to update low-stock products
     """
     try:
-        # Set up GraphQL transport and client
-        transport = RequestsHTTPTransport(
-            url="http://localhost:8000/graphql",
-            verify=True,
-            retries=3,
-        )
-        
-        client = Client(transport=transport, fetch_schema_from_transport=True)
+        # Runs in process unless CRM_JOB_GRAPHQL_URL is set
+        client = get_job_client()
         
         # GraphQL mutation to update low-stock products
-        mutation = gql("""
+        mutation = """
             mutation UpdateLowStockProducts {
                 updateLowStockProducts {
                     success
@@ -82,7 +64,7 @@ def update_low_stock():
                     }
                 }
             }
-        """)
+        """
         
         # Execute the mutation
         result = client.execute(mutation)
@@ -1,57 +1,30 @@
 #!/usr/bin/env python3
 
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
-from datetime import datetime, timedelta
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Make the project importable when cron runs this file directly
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_backend_graphql.settings')
+
+import django
+
+django.setup()
+
+from crm.reminders import dispatch_order_reminders
+
 
 def send_order_reminders():
-    # GraphQL transport
-    transport = RequestsHTTPTransport(
-        url="http://localhost:8000/graphql",
-        verify=True,
-        retries=3,
-    )
-    
-    # Create GraphQL client
-    client = Client(transport=transport, fetch_schema_from_transport=True)
-    
-    # Calculate date 7 days ago
-    one_week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-    
-    # GraphQL query to get pending orders from the last 7 days
-    query = gql("""
-    query GetRecentOrders($orderDateGte: String!) {
-        orders(orderDate_Gte: $orderDateGte) {
-            id
-            orderDate
-            customer {
-                email
-            }
-            status
-        }
-    }
-    """)
-    
     try:
-        # Execute GraphQL query with variables
-        variables = {"orderDateGte": one_week_ago}
-        result = client.execute(query, variable_values=variables)
-        
-        orders = result.get('orders', [])
+        # Streams unhandled orders from the last 7 days and emails each customer once
+        orders, emails = dispatch_order_reminders(days=7)
         
         # Log the results
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         with open('/tmp/order_reminders_log.txt', 'a') as log_file:
-            log_file.write(f"[{timestamp}] Processing {len(orders)} recent orders\n")
-            
-            for order in orders:
-                order_id = order.get('id')
-                customer_email = order.get('customer', {}).get('email', 'N/A')
-                order_date = order.get('orderDate', 'N/A')
-                status = order.get('status', 'N/A')
-                
-                log_entry = f"[{timestamp}] Order ID: {order_id}, Customer Email: {customer_email}, Order Date: {order_date}, Status: {status}\n"
-                log_file.write(log_entry)
+            log_file.write(f"[{timestamp}] Sent {emails} reminders covering {orders} recent orders\n")
         
         print("Order reminders processed!")
         
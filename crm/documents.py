@@ -0,0 +1,132 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from graphql import GraphQLError, parse
+from graphql.validation import validate
+
+from .models import PersistedQuery
+
+PERSISTED_QUERY_CACHE_PREFIX = 'crm:persisted-query:'
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+class DocumentCache:
+    """
+    Bounded LRU of parsed and validated GraphQL documents, keyed by the
+    schema and the SHA-256 of the query text. Documents that fail to parse
+    or validate are never cached.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+    def get(self, schema, query, validation_rules=None, max_errors=None):
+        """
+        Return (document, errors) for `query`, parsing and validating it only
+        on a cache miss
+        """
+        key = (id(schema), query_hash(query))
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+                return document, []
+
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            return None, [e]
+
+        errors = validate(schema, document, validation_rules, max_errors)
+        if errors:
+            return document, errors
+
+        with self._lock:
+            self._documents[key] = document
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.maxsize:
+                self._documents.popitem(last=False)
+        return document, []
+
+
+document_cache = DocumentCache(getattr(settings, 'CRM_DOCUMENT_CACHE_SIZE', 256))
+
+
+class PersistedQueryNotFound(GraphQLError):
+    def __init__(self):
+        super().__init__(
+            "PersistedQueryNotFound", extensions={"code": "PERSISTED_QUERY_NOT_FOUND"}
+        )
+
+
+def register_persisted_query(query):
+    """
+    Store a query under its SHA-256 hash and return the hash
+    """
+    sha256 = query_hash(query)
+    if cache.get(PERSISTED_QUERY_CACHE_PREFIX + sha256) is None:
+        PersistedQuery.objects.get_or_create(sha256=sha256, defaults={'query': query})
+        cache.set(PERSISTED_QUERY_CACHE_PREFIX + sha256, query, timeout=None)
+    return sha256
+
+
+def get_persisted_query(sha256):
+    """
+    The query registered under `sha256`, or None. The table is the store;
+    the cache only saves a lookup, so an evicted or per-process entry is
+    read again from the database.
+    """
+    query = cache.get(PERSISTED_QUERY_CACHE_PREFIX + sha256)
+    if query is None:
+        query = PersistedQuery.objects.filter(sha256=sha256).values_list('query', flat=True).first()
+        if query is not None:
+            cache.set(PERSISTED_QUERY_CACHE_PREFIX + sha256, query, timeout=None)
+    return query
+
+
+def resolve_persisted_query(query, extensions):
+    """
+    Apply the Apollo persisted query protocol
+    (extensions.persistedQuery.sha256Hash) and return the query text to run.
+
+    A hash on its own is looked up in the store. A hash sent together with
+    its query is checked and, when CRM_PERSISTED_QUERIES_AUTO_REGISTER is on
+    (the default), registered for later calls. With auto-registration off only
+    queries registered ahead of time (see register_persisted_queries) run.
+    """
+    persisted = (extensions or {}).get('persistedQuery')
+    if not persisted:
+        return query
+
+    sha256 = persisted.get('sha256Hash')
+    if not sha256:
+        raise GraphQLError("persistedQuery requires a sha256Hash")
+
+    if query is None:
+        query = get_persisted_query(sha256)
+        if query is None:
+            raise PersistedQueryNotFound()
+        return query
+
+    if query_hash(query) != sha256:
+        raise GraphQLError("Provided sha256Hash does not match query")
+    if getattr(settings, 'CRM_PERSISTED_QUERIES_AUTO_REGISTER', True):
+        register_persisted_query(query)
+    elif get_persisted_query(sha256) is None:
+        raise GraphQLError("Query is not in the persisted query allowlist")
+    return query
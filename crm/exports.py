@@ -0,0 +1,126 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from .filters import OrderFilter
+from .models import Order
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+ORDER_FIELDS = (
+    'id', 'order_date', 'total_amount', 'customer_id', 'customer__name', 'customer__email'
+)
+
+CSV_HEADER = (
+    'order_id', 'order_date', 'total_amount', 'customer_id', 'customer_name', 'customer_email',
+    'product_id', 'product_name', 'product_price',
+)
+
+
+def filtered_orders(filters=None):
+    """
+    Orders matching `filters`, given as OrderFilter data (e.g.
+    {'order_date_gte': '2024-01-01', 'customer_name': 'smith'})
+    """
+    filterset = OrderFilter(filters or {}, queryset=Order.objects.all())
+    if not filterset.is_valid():
+        raise Exception(f"Invalid filters: {filterset.errors.as_json()}")
+    return filterset.qs
+
+
+def order_chunks(queryset, chunk_size):
+    """
+    Yield lists of up to `chunk_size` orders, each with its product lines,
+    reading the orders through one server-side cursor
+    """
+    rows = queryset.order_by('id').values(*ORDER_FIELDS).iterator(chunk_size=chunk_size)
+    last_id = None
+    while True:
+        chunk = []
+        for row in islice(rows, chunk_size):
+            # Product filters join the M2M table; rows come ordered by id, so
+            # repeated orders are adjacent
+            if row['id'] != last_id:
+                chunk.append(row)
+                last_id = row['id']
+        if not chunk:
+            return
+
+        lines = defaultdict(list)
+        for order_id, product_id, name, price in (
+            Order.products.through.objects.using(queryset.db)
+            .filter(order_id__in=[row['id'] for row in chunk])
+            .order_by('order_id', 'pk')
+            .values_list('order_id', 'product_id', 'product__name', 'product__price')
+        ):
+            lines[order_id].append((product_id, name, price))
+        for row in chunk:
+            row['products'] = lines[row['id']]
+        yield chunk
+
+
+def ndjson_lines(chunks):
+    for chunk in chunks:
+        yield ''.join(
+            json.dumps({
+                'id': row['id'],
+                'order_date': row['order_date'].isoformat(),
+                'total_amount': str(row['total_amount']),
+                'customer': {
+                    'id': row['customer_id'],
+                    'name': row['customer__name'],
+                    'email': row['customer__email'],
+                },
+                'products': [
+                    {'id': product_id, 'name': name, 'price': str(price)}
+                    for product_id, name, price in row['products']
+                ],
+            }) + '\n'
+            for row in chunk
+        )
+
+
+class Echo:
+    """
+    File-like object for csv.writer that hands each row back instead of storing it
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(chunks):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for chunk in chunks:
+        rows = []
+        for row in chunk:
+            order = (
+                row['id'], row['order_date'].isoformat(), row['total_amount'],
+                row['customer_id'], row['customer__name'], row['customer__email'],
+            )
+            # One row per product line; orders without products keep one row
+            for product in row['products'] or [('', '', '')]:
+                rows.append(writer.writerow(order + product))
+        yield ''.join(rows)
+
+
+def export_orders(filters=None, format='ndjson', chunk_size=2000, using=None):
+    """
+    Stream the orders matching `filters` (OrderFilter data) with their
+    customer and product lines, as NDJSON (one order per line) or CSV (one
+    row per product line). Memory use depends on `chunk_size`, not on the
+    number of orders exported.
+
+    `using` names the database to read, e.g. a replica from
+    crm.routers.choose_replica(): the rows are read lazily, after any
+    read_from_replica() block would have ended.
+    """
+    if format not in EXPORT_FORMATS:
+        raise Exception(f"Unknown export format {format!r}, use one of {', '.join(EXPORT_FORMATS)}")
+    chunks = order_chunks(filtered_orders(filters).using(using), chunk_size)
+    return ndjson_lines(chunks) if format == 'ndjson' else csv_lines(chunks)
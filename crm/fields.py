@@ -0,0 +1,113 @@
+from functools import partial
+
+import graphene
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist
+from graphene.types.argument import to_arguments
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.filter import DjangoFilterConnectionField
+from promise import Promise
+
+from .aio import is_async
+from .pagination import keyset_connection
+from .planner import plan_queryset
+
+
+class CRMConnectionField(DjangoFilterConnectionField):
+    """
+    DjangoFilterConnectionField that shapes the queryset from the selection set
+    and lets the node type prime its per-request loaders with the whole page
+    before any nested field is resolved.
+
+    `order_by` adds an orderBy argument. Fields given a `keyset_ordering`
+    also accept `keyset: true`, which switches to cursors that encode the
+    sort key values (always ending in `id`) instead of row offsets.
+    """
+
+    def __init__(self, type_, *args, order_by=None, keyset_ordering=None, **kwargs):
+        if keyset_ordering is not None:
+            kwargs['keyset'] = graphene.Boolean(
+                description="Page with sort-key cursors instead of offsets"
+            )
+        self.keyset_ordering = keyset_ordering
+        super().__init__(type_, *args, **kwargs)
+        # DjangoFilterConnectionField accepts order_by but never exposes it
+        if order_by is not None:
+            self.args = to_arguments(self._base_args, {'order_by': order_by})
+
+    @classmethod
+    def get_ordering(cls, model, args, keyset_ordering):
+        ordering = [to_snake_case(name) for name in args.get('order_by') or []]
+        keyset = bool(args.get('keyset'))
+        if keyset and not ordering:
+            ordering = list(keyset_ordering)
+
+        for name in ordering:
+            field_name = name.lstrip('-')
+            try:
+                field = model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                field = None
+            if field is None or not field.concrete or field.is_relation:
+                raise Exception(f"Cannot order by {field_name}")
+            if keyset and field.null:
+                raise Exception(f"Keyset pagination cannot order by nullable field {field_name}")
+
+        # Keyset cursors need a unique tiebreaker as the last sort key
+        if keyset and not {'id', '-id'} & set(ordering):
+            ordering.append('id')
+        return ordering
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, filtering_args,
+                         filterset_class, keyset_ordering=None):
+        queryset = super().resolve_queryset(
+            connection, iterable, info, args, filtering_args, filterset_class
+        )
+        ordering = cls.get_ordering(queryset.model, args, keyset_ordering)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        # Sort key columns must be loaded to build keyset cursors
+        required = [name.lstrip('-') for name in ordering] if args.get('keyset') else []
+        return plan_queryset(queryset, info, required=required)
+
+    def get_queryset_resolver(self):
+        return partial(super().get_queryset_resolver(), keyset_ordering=self.keyset_ordering)
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        if args.get('keyset'):
+            return keyset_connection(connection, iterable, args, max_limit=max_limit)
+        return super().resolve_connection(connection, args, iterable, max_limit=max_limit)
+
+    @classmethod
+    def connection_resolver(cls, resolver, connection, default_manager, queryset_resolver,
+                            max_limit, enforce_first_or_last, root, info, **args):
+        if is_async(info):
+            # graphene-django counts and slices the queryset synchronously
+            return sync_to_async(cls.resolve_page)(
+                resolver, connection, default_manager, queryset_resolver,
+                max_limit, enforce_first_or_last, root, info, **args
+            )
+        return cls.resolve_page(
+            resolver, connection, default_manager, queryset_resolver,
+            max_limit, enforce_first_or_last, root, info, **args
+        )
+
+    @classmethod
+    def resolve_page(cls, resolver, connection, default_manager, queryset_resolver,
+                     max_limit, enforce_first_or_last, root, info, **args):
+        result = super().connection_resolver(
+            resolver, connection, default_manager, queryset_resolver,
+            max_limit, enforce_first_or_last, root, info, **args
+        )
+
+        def prime(resolved):
+            prime_loaders = getattr(connection._meta.node, 'prime_loaders', None)
+            if prime_loaders is not None:
+                prime_loaders([edge.node for edge in resolved.edges], info)
+            return resolved
+
+        if Promise.is_thenable(result):
+            return Promise.resolve(result).then(prime)
+        return prime(result)
@@ -1,6 +1,7 @@
 import django_filters
 from django.db.models import Q
 from .models import Customer, Product, Order
+from .search import search, search_orders
 
 class CustomerFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(lookup_expr='icontains')
@@ -8,6 +9,14 @@ class CustomerFilter(django_filters.FilterSet):
     created_at_gte = django_filters.DateFilter(field_name='created_at', lookup_expr='gte')
     created_at_lte = django_filters.DateFilter(field_name='created_at', lookup_expr='lte')
     phone_pattern = django_filters.CharFilter(method='filter_phone_pattern')
+    order_count_gte = django_filters.NumberFilter(field_name='stats__order_count', lookup_expr='gte')
+    order_count_lte = django_filters.NumberFilter(method='filter_order_count_lte')
+    lifetime_revenue_gte = django_filters.NumberFilter(field_name='stats__lifetime_revenue', lookup_expr='gte')
+    lifetime_revenue_lte = django_filters.NumberFilter(field_name='stats__lifetime_revenue', lookup_expr='lte')
+    last_order_date_gte = django_filters.DateFilter(field_name='stats__last_order_date', lookup_expr='gte')
+    last_order_date_lte = django_filters.DateFilter(field_name='stats__last_order_date', lookup_expr='lte')
+    no_orders_since = django_filters.DateFilter(method='filter_no_orders_since')
+    search = django_filters.CharFilter(method='filter_search')
     
     def filter_phone_pattern(self, queryset, name, value):
         """
@@ -16,6 +25,27 @@ class CustomerFilter(django_filters.FilterSet):
         """
         return queryset.filter(phone__startswith=value)
     
+    def filter_order_count_lte(self, queryset, name, value):
+        """
+        Customers without a stats row have never ordered, so they count as 0
+        """
+        return queryset.filter(Q(stats__order_count__lte=value) | Q(stats__isnull=True))
+    
+    def filter_no_orders_since(self, queryset, name, value):
+        """
+        Customers whose last order is older than the given date (or who never ordered).
+        Uses the indexed CustomerStats.last_order_date instead of an anti-join on orders.
+        """
+        return queryset.filter(
+            Q(stats__last_order_date__lt=value) | Q(stats__last_order_date__isnull=True)
+        )
+    
+    def filter_search(self, queryset, name, value):
+        """
+        Ranked substring search over name and email using the n-gram index
+        """
+        return search(queryset, value)
+    
     class Meta:
         model = Customer
         fields = ['name', 'email']
@@ -27,6 +57,7 @@ class ProductFilter(django_filters.FilterSet):
     stock_gte = django_filters.NumberFilter(field_name='stock', lookup_expr='gte')
     stock_lte = django_filters.NumberFilter(field_name='stock', lookup_expr='lte')
     low_stock = django_filters.BooleanFilter(method='filter_low_stock')
+    search = django_filters.CharFilter(method='filter_search')
     
     def filter_low_stock(self, queryset, name, value):
         """
@@ -36,6 +67,12 @@ class ProductFilter(django_filters.FilterSet):
             return queryset.filter(stock__lt=10)
         return queryset
     
+    def filter_search(self, queryset, name, value):
+        """
+        Ranked substring search over the product name using the n-gram index
+        """
+        return search(queryset, value)
+    
     class Meta:
         model = Product
         fields = ['name', 'price', 'stock']
@@ -48,6 +85,13 @@ class OrderFilter(django_filters.FilterSet):
     customer_name = django_filters.CharFilter(field_name='customer__name', lookup_expr='icontains')
     product_name = django_filters.CharFilter(field_name='products__name', lookup_expr='icontains')
     product_id = django_filters.NumberFilter(field_name='products__id')
+    search = django_filters.CharFilter(method='filter_search')
+    
+    def filter_search(self, queryset, name, value):
+        """
+        Orders whose customer or products match, via the n-gram indexes
+        """
+        return search_orders(queryset, value)
     
     class Meta:
         model = Order
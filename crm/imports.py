@@ -0,0 +1,185 @@
+import csv
+import json
+from collections import Counter
+from datetime import datetime, time
+
+from django.db import IntegrityError, connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Customer, Order, Product
+from .response_cache import invalidate_models
+from .stats import invalidate_crm_statistics, record_orders
+
+
+def parse_ids(value):
+    if isinstance(value, str):
+        # CSV cells hold "3;7;7" or "3 7 7"
+        value = value.replace(';', ' ').split()
+    return [int(pk) for pk in value]
+
+
+def parse_order_date(value):
+    if value is None or value == '':
+        return None
+    if not isinstance(value, datetime):
+        text = str(value)
+        value = parse_datetime(text)
+        if value is None:
+            day = parse_date(text)
+            if day is None:
+                raise Exception(f"Invalid order date {text!r}")
+            value = datetime.combine(day, time())
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def parse_order(data):
+    """
+    Return (customer ID, Counter of product IDs, order date or None) for one
+    input row. Accepts {'customer_id', 'product_ids', 'order_date'} as well
+    as the order objects written by crm.exports.
+    """
+    if not isinstance(data, dict):
+        raise Exception("Not an order object")
+    try:
+        if 'customer_id' in data:
+            customer_id = int(data['customer_id'])
+        else:
+            customer_id = int(data['customer']['id'])
+        if 'product_ids' in data:
+            product_ids = parse_ids(data['product_ids'] or [])
+        else:
+            product_ids = [int(product['id']) for product in data.get('products') or []]
+    except (KeyError, TypeError, ValueError):
+        raise Exception("Needs a customer ID and a list of product IDs")
+    if not product_ids:
+        raise Exception("At least one product is required")
+    # Repeating a product ID orders more than one unit of it, as in createOrder
+    return customer_id, Counter(product_ids), parse_order_date(data.get('order_date'))
+
+
+def import_order_chunks(rows, chunk_size=1000):
+    """
+    Create orders from an iterable of input rows (see parse_order),
+    `chunk_size` at a time. Yields (orders created, errors) per chunk;
+    errors read "Row n: ..." with rows counted from 1.
+
+    Each chunk costs one customer and one product lookup, a bulk_create of
+    the orders and one of their product rows, and a bulk stats update, in a
+    single transaction. Totals are computed from the current product prices.
+    Unlike createOrder no stock is reserved: imported orders are history.
+    """
+    if chunk_size < 1:
+        raise Exception("Chunk size must be positive")
+
+    chunk = []
+    for number, data in enumerate(rows, start=1):
+        chunk.append((number, data))
+        if len(chunk) >= chunk_size:
+            yield import_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield import_chunk(chunk)
+
+
+def import_chunk(chunk):
+    errors = []
+    parsed = []
+    for number, data in chunk:
+        try:
+            parsed.append((number, *parse_order(data)))
+        except Exception as e:
+            errors.append((number, str(e)))
+
+    # Set lookups for every reference in the chunk
+    customers = set(
+        Customer.objects.filter(id__in={row[1] for row in parsed}).values_list('id', flat=True)
+    )
+    prices = dict(
+        Product.objects.filter(
+            id__in={pk for row in parsed for pk in row[2]}
+        ).values_list('id', 'price')
+    )
+
+    now = timezone.now()
+    valid = []
+    for number, customer_id, quantities, order_date in parsed:
+        if customer_id not in customers:
+            errors.append((number, f"Customer {customer_id} does not exist"))
+            continue
+        missing = [str(pk) for pk in quantities if pk not in prices]
+        if missing:
+            errors.append((number, f"Product(s) {', '.join(missing)} do not exist"))
+            continue
+        order = Order(
+            customer_id=customer_id,
+            total_amount=sum(prices[pk] * quantity for pk, quantity in quantities.items()),
+            order_date=order_date or now,
+        )
+        valid.append((number, order, quantities))
+
+    orders = [order for _, order, _ in valid]
+    if orders:
+        try:
+            insert_orders(valid)
+        except IntegrityError as e:
+            # A customer or product deleted since the lookup
+            errors.extend((number, str(e)) for number, _, _ in valid)
+            orders = []
+
+    return orders, [f"Row {number}: {message}" for number, message in sorted(errors)]
+
+
+def insert_orders(valid):
+    through = Order.products.through
+    using = router.db_for_write(through)
+    quote = connections[using].ops.quote_name
+    # The through rows are plain ID pairs: one executemany INSERT skips
+    # building and preparing a model instance per row
+    sql = (
+        f"INSERT INTO {quote(through._meta.db_table)} "
+        f"({quote(through._meta.get_field('order').column)}, "
+        f"{quote(through._meta.get_field('product').column)}) VALUES (%s, %s)"
+    )
+
+    with transaction.atomic(using=using):
+        Order.objects.using(using).bulk_create([order for _, order, _ in valid])
+        with connections[using].cursor() as cursor:
+            cursor.executemany(sql, [
+                (order.pk, pk) for _, order, quantities in valid for pk in quantities
+            ])
+
+        # bulk_create skips the signals that maintain the stats
+        totals = {}
+        for _, order, _ in valid:
+            count, revenue, latest = totals.get(order.customer_id, (0, 0, order.order_date))
+            totals[order.customer_id] = (
+                count + 1, revenue + order.total_amount, max(latest, order.order_date)
+            )
+        record_orders(totals)
+
+    invalidate_models(Order)
+    invalidate_crm_statistics()
+
+
+def read_order_file(path, format=None):
+    """
+    Yield input rows from a CSV file (customer_id, product_ids and optional
+    order_date columns) or an NDJSON file (one order object per line,
+    including crm.exports output). The format follows the file extension
+    unless given.
+    """
+    format = format or ('csv' if path.endswith('.csv') else 'ndjson')
+    with open(path, newline='') as order_file:
+        if format == 'csv':
+            yield from csv.DictReader(order_file)
+            return
+        for line in order_file:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Reported as a bad row instead of ending the import
+                    yield None
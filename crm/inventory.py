@@ -0,0 +1,54 @@
+from django.db import connections, router, transaction
+from django.db.models import F
+
+from .models import Product
+from .response_cache import invalidate_models
+
+
+def supports_update_returning(connection):
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35, 0)
+    return False
+
+
+def restock_low_stock(threshold=10, increment=10, batch_size=1000):
+    """
+    Add `increment` to the stock of every product below `threshold` and
+    return the updated products.
+
+    Uses a single UPDATE ... RETURNING where the backend supports it.
+    Elsewhere the matching IDs are locked and updated in batches, so the
+    returned products are exactly the ones that were restocked.
+    """
+    using = router.db_for_write(Product)
+    connection = connections[using]
+    fields = Product._meta.concrete_fields
+
+    if supports_update_returning(connection):
+        quote = connection.ops.quote_name
+        sql = (
+            f"UPDATE {quote(Product._meta.db_table)} "
+            f"SET {quote('stock')} = {quote('stock')} + %s "
+            f"WHERE {quote('stock')} < %s "
+            f"RETURNING {', '.join(quote(field.column) for field in fields)}"
+        )
+        with transaction.atomic(using=using):
+            # list() so the statement runs exactly once
+            products = list(Product.objects.db_manager(using).raw(sql, [increment, threshold]))
+    else:
+        with transaction.atomic(using=using):
+            ids = list(
+                Product.objects.using(using).select_for_update()
+                .filter(stock__lt=threshold).values_list('id', flat=True)
+            )
+            for start in range(0, len(ids), batch_size):
+                Product.objects.using(using).filter(id__in=ids[start:start + batch_size]).update(
+                    stock=F('stock') + increment
+                )
+            products = list(Product.objects.using(using).filter(id__in=ids).order_by('id'))
+
+    # Raw and queryset updates skip the model signals
+    invalidate_models(Product)
+    return products
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import lru_cache
+from types import SimpleNamespace
+
+from django.conf import settings
+from graphql import OperationType, execute, get_operation_ast
+
+from .documents import document_cache
+from .routers import read_from_replica
+
+DEFAULT_GRAPHQL_URL = 'http://localhost:8000/graphql'
+
+
+class LocalJobClient:
+    """
+    Runs operations directly against the project's graphene schema: no HTTP
+    round trip and no introspection. Documents are parsed and validated once
+    per process by crm.documents. Queries read from a database replica.
+    """
+
+    def __init__(self, schema=None):
+        if schema is None:
+            from alx_backend_graphql.schema import schema
+        self.schema = schema
+
+    def execute(self, query, variables=None, operation_name=None):
+        """
+        Return the operation's data, or raise on the first error
+        """
+        graphql_schema = self.schema.graphql_schema
+        document, errors = document_cache.get(graphql_schema, query)
+        if not errors:
+            operation_ast = get_operation_ast(document, operation_name)
+            is_query = operation_ast is not None and operation_ast.operation == OperationType.QUERY
+            with read_from_replica() if is_query else nullcontext():
+                # A fresh context per operation, so loaders never serve rows from an earlier run
+                result = execute(
+                    graphql_schema, document, variable_values=variables,
+                    operation_name=operation_name, context_value=SimpleNamespace(),
+                )
+            errors = result.errors
+        if errors:
+            raise Exception(errors[0].message)
+        return result.data
+
+
+@lru_cache(maxsize=64)
+def client_document(query):
+    from gql import gql
+    return gql(query)
+
+
+class HTTPJobClient:
+    """
+    Runs operations against a CRM GraphQL endpoint with gql. One requests
+    session is kept open for the life of the process, and the schema comes
+    from an introspection snapshot on disk (CRM_JOB_SCHEMA_CACHE), fetched
+    again once it is older than CRM_JOB_SCHEMA_MAX_AGE seconds.
+    """
+
+    def __init__(self, url):
+        from gql import Client
+        from gql.transport.requests import RequestsHTTPTransport
+
+        self.url = url
+        self.snapshot_path = getattr(settings, 'CRM_JOB_SCHEMA_CACHE', '/tmp/crm_graphql_schema.json')
+        introspection = self.load_snapshot()
+        self.client = Client(
+            transport=RequestsHTTPTransport(url=url, verify=True, retries=3),
+            introspection=introspection,
+            fetch_schema_from_transport=introspection is None,
+        )
+        self.session = self.client.connect_sync()
+        if introspection is None:
+            self.save_snapshot(self.client.introspection)
+
+    def load_snapshot(self):
+        max_age = getattr(settings, 'CRM_JOB_SCHEMA_MAX_AGE', 24 * 60 * 60)
+        try:
+            if time.time() - os.path.getmtime(self.snapshot_path) > max_age:
+                return None
+            with open(self.snapshot_path) as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except (OSError, ValueError):
+            return None
+        return snapshot['introspection'] if snapshot.get('url') == self.url else None
+
+    def save_snapshot(self, introspection):
+        # Written to a temporary file first, so concurrent jobs never read half a snapshot
+        temp_path = f'{self.snapshot_path}.{os.getpid()}'
+        try:
+            with open(temp_path, 'w') as snapshot_file:
+                json.dump({'url': self.url, 'introspection': introspection}, snapshot_file)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError:
+            pass
+
+    def execute(self, query, variables=None, operation_name=None):
+        """
+        Return the operation's data, or raise on the first error
+        """
+        return self.session.execute(
+            client_document(query), variable_values=variables, operation_name=operation_name
+        )
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_job_client(http=False):
+    """
+    The process-wide GraphQL client for cron jobs and Celery tasks.
+
+    Operations run in process unless CRM_JOB_GRAPHQL_URL is set, or `http`
+    asks for the endpoint itself (CRM_JOB_GRAPHQL_URL, else the local dev
+    server), e.g. to check that it responds.
+    """
+    url = getattr(settings, 'CRM_JOB_GRAPHQL_URL', None)
+    if http and not url:
+        url = DEFAULT_GRAPHQL_URL
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = _clients[url] = HTTPJobClient(url) if url else LocalJobClient()
+        return client
@@ -0,0 +1,144 @@
+from collections import defaultdict
+
+from .models import Customer, Order
+
+
+class BatchLoader:
+    """
+    Minimal synchronous DataLoader.
+
+    Keys are queued with prime() (usually by the resolver that produced the
+    parent result set) and the first load() flushes every queued key with a
+    single batch_load() call. Results are cached for the rest of the request.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._queue = set()
+
+    def prime(self, keys):
+        self._queue.update(key for key in keys if key not in self._cache)
+
+    def load(self, key):
+        if key not in self._cache:
+            self._queue.add(key)
+            keys = list(self._queue)
+            self._queue.clear()
+            results = self.batch_load(keys)
+            for batch_key in keys:
+                self._cache[batch_key] = results.get(batch_key, self.default())
+        return self._cache[key]
+
+    def load_many(self, keys):
+        """
+        Load every uncached key now, in one batch
+        """
+        keys = [key for key in set(keys) if key not in self._cache]
+        if keys:
+            self._queue.difference_update(keys)
+            results = self.batch_load(keys)
+            for key in keys:
+                self._cache[key] = results.get(key, self.default())
+
+    def default(self):
+        return None
+
+    def batch_load(self, keys):
+        """
+        Return a dict mapping each key to its value
+        """
+        raise NotImplementedError
+
+
+class CustomerLoader(BatchLoader):
+    """
+    Loads customers by ID with one `id IN (...)` query
+    """
+
+    def batch_load(self, keys):
+        return Customer.objects.select_related('stats').in_bulk(keys)
+
+
+class OrderProductsLoader(BatchLoader):
+    """
+    Loads the products of many orders with one query over the M2M through table
+    """
+
+    def default(self):
+        return []
+
+    def batch_load(self, keys):
+        products_by_order = defaultdict(list)
+        rows = (
+            Order.products.through.objects
+            .filter(order_id__in=keys)
+            .select_related('product')
+            .order_by('pk')
+        )
+        for row in rows:
+            products_by_order[row.order_id].append(row.product)
+        return products_by_order
+
+
+class Loaders:
+    """
+    The set of loaders shared by every resolver of a single request
+    """
+
+    def __init__(self):
+        self.customer = CustomerLoader()
+        self.order_products = OrderProductsLoader()
+
+    def prime_orders(self, orders, fields):
+        """
+        Queue the relations in `fields` for a page of orders so they resolve
+        in one batch each. Unselected relations are left alone: the planner
+        may have deferred their columns.
+        """
+        if 'customer' in fields:
+            self.customer.prime(
+                order.customer_id for order in orders if not Order.customer.is_cached(order)
+            )
+        if 'products' in fields:
+            self.order_products.prime(
+                order.pk for order in orders
+                if 'products' not in getattr(order, '_prefetched_objects_cache', {})
+            )
+
+    def load_orders(self, orders, fields):
+        """
+        Load the relations in `fields` that the queryset didn't already join
+        or prefetch, for every order right away
+        """
+        if 'customer' in fields:
+            self.customer.load_many(
+                order.customer_id for order in orders if not Order.customer.is_cached(order)
+            )
+        if 'products' in fields:
+            self.order_products.load_many(
+                order.pk for order in orders
+                if 'products' not in getattr(order, '_prefetched_objects_cache', {})
+            )
+
+
+def get_loaders(context):
+    """
+    Return the per-request loaders, creating them on first use.
+    Without a context (e.g. schema.execute() in a shell) batching is per call.
+    """
+    if context is None:
+        return Loaders()
+    loaders = getattr(context, 'crm_loaders', None)
+    if loaders is None:
+        loaders = Loaders()
+        context.crm_loaders = loaders
+    return loaders
+
+
+def reset_loaders(context):
+    """
+    Forget everything loaded so far. Called after a mutation, so later
+    operations of the same batched request don't read stale rows.
+    """
+    if context is not None:
+        context.crm_loaders = None
@@ -0,0 +1,102 @@
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from crm.models import Customer, Order, Product
+
+INDEXED_MODELS = (Customer, Product, Order)
+
+
+def workloads():
+    """
+    The filter and cleanup access paths the 0002_filter_indexes migration
+    targets, each evaluated the way a connection page is (COUNT + first page)
+    """
+    now = timezone.now()
+    year_ago = now - timedelta(days=365)
+    return {
+        'orders.order_date_range': Order.objects.filter(
+            order_date__gte=now - timedelta(days=30)).order_by('order_date', 'id'),
+        'orders.total_amount_gte': Order.objects.filter(total_amount__gte=900).order_by('id'),
+        'products.stock_range': Product.objects.filter(stock__gte=20, stock__lte=25).order_by('id'),
+        'products.price_range': Product.objects.filter(price__gte=10, price__lte=12).order_by('id'),
+        'products.low_stock': Product.objects.filter(stock__lt=10).order_by('id'),
+        'customers.created_at_range': Customer.objects.filter(
+            created_at__gte=now - timedelta(days=7)).order_by('created_at', 'id'),
+        'customers.phone_startswith': Customer.objects.filter(phone__startswith='+1555').order_by('id'),
+        'cleanup.inactive_customers': Customer.objects.filter(
+            ~Exists(Order.objects.filter(customer=OuterRef('pk'), order_date__gte=year_ago))
+        ).order_by('id'),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the CRM filter/cleanup queries on the current database. "
+        "With --compare the CRM indexes are dropped for a 'before' run and recreated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--compare', action='store_true',
+                            help="Also time every query without the CRM indexes")
+        parser.add_argument('--explain', action='store_true', help="Print each query plan")
+        parser.add_argument('--output', help="Write the timings to this JSON file")
+
+    def time_workloads(self, repeat, page_size, explain=False):
+        results = {}
+        for name, queryset in workloads().items():
+            if explain:
+                self.stdout.write(f"{name}:\n{queryset[:page_size].explain()}")
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                queryset.count()
+                list(queryset[:page_size])
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = round(statistics.median(timings), 3)
+        return results
+
+    def set_indexes(self, present):
+        with connection.schema_editor() as schema_editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    if present:
+                        schema_editor.add_index(model, index)
+                    else:
+                        schema_editor.remove_index(model, index)
+
+    def handle(self, *args, **options):
+        repeat, page_size = options['repeat'], options['page_size']
+        report = {
+            'vendor': connection.vendor,
+            'rows': {model.__name__: model.objects.count() for model in INDEXED_MODELS},
+        }
+
+        if options['compare']:
+            self.set_indexes(present=False)
+            try:
+                report['before_ms'] = self.time_workloads(repeat, page_size, options['explain'])
+            finally:
+                self.set_indexes(present=True)
+        report['after_ms'] = self.time_workloads(repeat, page_size, options['explain'])
+
+        self.stdout.write(f"Rows: {report['rows']}")
+        for name, after in report['after_ms'].items():
+            before = report.get('before_ms', {}).get(name)
+            if before is None:
+                self.stdout.write(f"{name:32} {after:10.2f} ms")
+            else:
+                speedup = before / after if after else float('inf')
+                self.stdout.write(f"{name:32} {before:10.2f} ms -> {after:10.2f} ms  ({speedup:.1f}x)")
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
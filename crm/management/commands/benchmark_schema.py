@@ -0,0 +1,268 @@
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from alx_backend_graphql.schema import schema
+from crm.models import Customer, CustomerStats, Order, Product
+from crm.rollup import rebuild_sales_rollup
+from crm.seeding import seed
+from crm.stats import invalidate_crm_statistics
+
+# Root fields of crm.schema; values are (document, builds variables from the data)
+QUERIES = {
+    'customers': ('{ customers { id name email orderCount } }', None),
+    'products': ('{ products { id name price stock } }', None),
+    'orders': (
+        '{ orders { id totalAmount customer { name } products { edges { node { name } } } } }',
+        None,
+    ),
+    'allCustomers': (
+        'query { allCustomers(first: 50, orderBy: ["-created_at"]) { '
+        'edges { node { id name email orderCount lifetimeRevenue } } pageInfo { endCursor } } }',
+        None,
+    ),
+    'allCustomers.keyset': (
+        'query { allCustomers(first: 50, keyset: true) '
+        '{ edges { node { id name createdAt } } pageInfo { hasNextPage endCursor } } }',
+        None,
+    ),
+    'allCustomers.search': (
+        'query { allCustomers(first: 50, search: "johnson") { edges { node { id name email } } } }',
+        None,
+    ),
+    'allProducts': (
+        'query { allProducts(first: 50, lowStock: true) { edges { node { id name stock } } } }',
+        None,
+    ),
+    'allOrders': (
+        'query { allOrders(first: 50, orderBy: ["-order_date"]) { edges { node { id totalAmount '
+        'customer { name email } products { edges { node { name price } } } } } } }',
+        None,
+    ),
+    'crmStatistics': ('{ crmStatistics { totalCustomers totalOrders totalRevenue } }', None),
+    'salesTimeseries': (
+        'query($from: Date!, $to: Date!) { salesTimeseries(from: $from, to: $to, bucket: WEEK) '
+        '{ start units revenue orderCount } }',
+        lambda data: {'from': data['year_ago'], 'to': data['today']},
+    ),
+}
+
+MUTATIONS = {
+    'createCustomer': (
+        'mutation($input: CustomerInput!) { createCustomer(input: $input) { customer { id } } }',
+        lambda data: {'input': {'name': 'Bench Mark', 'email': 'bench.mark@example.com'}},
+    ),
+    'bulkCreateCustomers': (
+        'mutation($inputs: [CustomerInput]!) { bulkCreateCustomers(inputs: $inputs) '
+        '{ customers { id } errors } }',
+        lambda data: {'inputs': [
+            {'name': f'Bench {i}', 'email': f'bench{i}@example.com'} for i in range(100)
+        ]},
+    ),
+    'createProduct': (
+        'mutation($input: ProductInput!) { createProduct(input: $input) { product { id } } }',
+        lambda data: {'input': {'name': 'Bench Widget', 'price': '9.99', 'stock': 5}},
+    ),
+    'createOrder': (
+        'mutation($input: OrderInput!) { createOrder(input: $input) { order { id totalAmount } } }',
+        lambda data: {'input': {'customerId': data['customer_id'], 'productIds': data['product_ids']}},
+    ),
+    'bulkCreateOrders': (
+        'mutation($inputs: [OrderInput]!) { bulkCreateOrders(inputs: $inputs) '
+        '{ orders { id } errors } }',
+        lambda data: {'inputs': [
+            {'customerId': data['customer_id'], 'productIds': data['product_ids']} for _ in range(100)
+        ]},
+    ),
+    'updateLowStockProducts': (
+        'mutation { updateLowStockProducts { success updatedProducts { id stock } } }',
+        None,
+    ),
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every root query and mutation of the CRM schema and record latency, "
+        "SQL query counts and peak Python memory as JSON. "
+        "With --sizes the CRM tables are wiped and reseeded for each size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', help="Comma-separated customer counts to seed, e.g. 1000,10000")
+        parser.add_argument('--products-per-customer', type=float, default=0.1)
+        parser.add_argument('--orders-per-customer', type=float, default=5)
+        parser.add_argument('--workers', type=int, default=1, help="Seed worker processes")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--only', help="Comma-separated operation names to run")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--baseline', help="Compare the medians with an earlier --output file")
+
+    def execute_operation(self, document, variables):
+        request = RequestFactory().post('/graphql')
+        result = schema.execute(document, variable_values=variables, context_value=request)
+        if result.errors:
+            raise CommandError(f"{result.errors[0]}")
+        return result
+
+    def run(self, document, variables, mutation):
+        """
+        One execution. Mutations are rolled back so every run sees the same data.
+        """
+        # Measure the aggregates, not the statistics cache
+        invalidate_crm_statistics()
+        if not mutation:
+            return self.execute_operation(document, variables)
+        try:
+            with transaction.atomic():
+                self.execute_operation(document, variables)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def measure(self, document, variables, mutation, repeat):
+        self.run(document, variables, mutation)  # warm up
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            self.run(document, variables, mutation)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        # Separate run: tracemalloc slows everything down
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            try:
+                self.run(document, variables, mutation)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'min_ms': round(timings[0], 3),
+            'queries': len([q for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def benchmark(self, operations, repeat):
+        # Values the operations need, read once per data size
+        today = timezone.localdate()
+        data = {
+            'today': today.isoformat(),
+            'year_ago': (today - timedelta(days=365)).isoformat(),
+            'customer_id': Customer.objects.order_by('id').values_list('id', flat=True).first(),
+            'product_ids': list(
+                Product.objects.filter(stock__gte=10).order_by('id').values_list('id', flat=True)[:3]
+            ),
+        }
+        results = {}
+        for name, (document, variables, mutation) in operations.items():
+            if name in ('createOrder', 'bulkCreateOrders') and not (data['customer_id'] and data['product_ids']):
+                continue
+            results[name] = self.measure(
+                document, variables(data) if variables else None, mutation, repeat
+            )
+            self.stdout.write(
+                f"  {name:28} {results[name]['median_ms']:10.2f} ms  "
+                f"{results[name]['queries']:4} queries  {results[name]['peak_kib']:10.1f} KiB"
+            )
+        return results
+
+    def handle(self, *args, **options):
+        operations = {name: (document, variables, False) for name, (document, variables) in QUERIES.items()}
+        operations.update(
+            {name: (document, variables, True) for name, (document, variables) in MUTATIONS.items()}
+        )
+        if options['only']:
+            wanted = options['only'].split(',')
+            unknown = set(wanted) - set(operations)
+            if unknown:
+                raise CommandError(f"Unknown operations: {', '.join(sorted(unknown))}")
+            operations = {name: operations[name] for name in wanted}
+
+        report = {
+            'commit': git_commit(),
+            'vendor': connection.vendor,
+            'started_at': timezone.now().isoformat(),
+            'repeat': options['repeat'],
+            'runs': [],
+        }
+
+        sizes = [int(size) for size in options['sizes'].split(',')] if options['sizes'] else [None]
+        for size in sizes:
+            if size is not None:
+                self.stdout.write(f"Seeding {size} customers...")
+                seed(
+                    customers=size,
+                    products=max(10, int(size * options['products_per_customer'])),
+                    orders=int(size * options['orders_per_customer']),
+                    workers=options['workers'],
+                    clear=True,
+                )
+                # salesTimeseries reads the rollup, which seeding leaves empty
+                rebuild_sales_rollup()
+            rows = {
+                model.__name__: model.objects.count()
+                for model in (Customer, Product, Order, CustomerStats)
+            }
+            self.stdout.write(f"Rows: {rows}")
+            report['runs'].append({
+                'size': size,
+                'rows': rows,
+                'operations': self.benchmark(operations, options['repeat']),
+            })
+
+        if options['baseline']:
+            self.compare(report, options['baseline'])
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+    def compare(self, report, path):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        # Runs are matched on the number of customers they saw
+        previous = {
+            (run['rows']['Customer'], name): result
+            for run in baseline['runs'] for name, result in run['operations'].items()
+        }
+        self.stdout.write(f"Compared with {baseline.get('commit') or path}:")
+        for run in report['runs']:
+            for name, result in run['operations'].items():
+                before = previous.get((run['rows']['Customer'], name))
+                if before is None:
+                    continue
+                ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+                self.stdout.write(
+                    f"  {run['rows']['Customer']:>8} {name:28} {before['median_ms']:10.2f} -> "
+                    f"{result['median_ms']:10.2f} ms ({ratio:.2f}x), "
+                    f"queries {before['queries']} -> {result['queries']}"
+                )
@@ -0,0 +1,74 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from crm.models import Customer, Order
+
+
+class Command(BaseCommand):
+    help = "Delete customers with no orders in the last --days days, in throttled batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--sleep', type=float, default=0.1,
+            help="Seconds to pause between batches so other writers can take the locks"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only count the customers")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+
+        # One NOT EXISTS anti-join instead of an order query per customer
+        inactive = Customer.objects.filter(
+            ~Exists(Order.objects.filter(customer=OuterRef('pk'), order_date__gte=cutoff))
+        )
+
+        if options['dry_run']:
+            count = inactive.count()
+            self.stdout.write(f"Dry run: {count} inactive customers would be deleted")
+            return
+
+        deleted = 0
+        started = time.monotonic()
+        while True:
+            ids = list(inactive.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += self.delete_batch(inactive, ids)
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"Deleted {deleted} customers ({deleted / elapsed if elapsed else 0:.0f} rows/s)"
+            )
+            if len(ids) < batch_size:
+                break
+            time.sleep(options['sleep'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} inactive customers in {elapsed:.1f}s "
+            f"({deleted / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
+
+    def delete_batch(self, inactive, ids):
+        """
+        Delete one batch in a short transaction. The delete cascades to the
+        customers' orders and stats rows and sends their post_delete signals,
+        which keep CustomerStats and the caches right.
+        Returns the number of customers deleted.
+        """
+        with transaction.atomic():
+            # A customer who ordered since the batch was picked is kept; the
+            # row lock (where supported) holds off new orders until commit
+            ids = list(inactive.filter(pk__in=ids).select_for_update().values_list('pk', flat=True))
+            if not ids:
+                return 0
+            Customer.objects.filter(pk__in=ids).delete()
+        return len(ids)
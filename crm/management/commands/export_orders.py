@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.exports import EXPORT_FORMATS, export_orders
+from crm.filters import OrderFilter
+from crm.routers import choose_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream orders with their customer and product lines as NDJSON or CSV. "
+        "Takes the OrderFilter filters as options, e.g. --order-date-gte 2024-01-01"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--output', help="Write to this file instead of stdout")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        for name in OrderFilter.base_filters:
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=f'filter_{name}')
+
+    def handle(self, *args, **options):
+        filters = {
+            name: options[f'filter_{name}']
+            for name in OrderFilter.base_filters
+            if options[f'filter_{name}'] is not None
+        }
+        try:
+            lines = export_orders(
+                filters, format=options['format'], chunk_size=options['chunk_size'],
+                using=choose_replica(),
+            )
+        except Exception as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(lines)
+        else:
+            for chunk in lines:
+                self.stdout.write(chunk, ending='')
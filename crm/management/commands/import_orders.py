@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.imports import import_order_chunks, read_order_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Import orders from a CSV file (customer_id, product_ids, order_date columns) "
+        "or an NDJSON file, e.g. one written by export_orders. "
+        "Invalid rows are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Default: from the file extension")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--max-errors', type=int, default=100, help="Errors to print")
+
+    def handle(self, *args, **options):
+        rows = read_order_file(options['path'], options['format'])
+        created = failed = 0
+        started = time.monotonic()
+        try:
+            for orders, errors in import_order_chunks(rows, chunk_size=options['chunk_size']):
+                created += len(orders)
+                for error in errors:
+                    if failed < options['max_errors']:
+                        self.stderr.write(error)
+                    failed += 1
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"Imported {created} orders")
+        except Exception as e:
+            raise CommandError(f"{e} ({created} orders imported before the error)")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {created} orders in {elapsed:.1f}s "
+            f"({created / elapsed if elapsed else 0:.0f}/s), {failed} rows rejected"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from crm.stats import rebuild_customer_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the CustomerStats table from scratch from the Order table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_customer_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {written} customers"))
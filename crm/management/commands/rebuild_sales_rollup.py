@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from crm.rollup import rebuild_sales_rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily per-product sales rollup from scratch from the Order table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        written = rebuild_sales_rollup(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the sales rollup: {written} product days"))
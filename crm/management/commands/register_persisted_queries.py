@@ -0,0 +1,17 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from crm.documents import register_persisted_query
+
+
+class Command(BaseCommand):
+    help = "Register .graphql files as persisted queries (the allowlist when auto-registration is off)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help=".graphql files to register")
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            sha256 = register_persisted_query(Path(path).read_text())
+            self.stdout.write(f"{sha256}  {path}")
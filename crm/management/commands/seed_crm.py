@@ -0,0 +1,42 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from crm.seeding import seed
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic customers, products and orders with bulk_create across worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=10000)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=50000)
+        parser.add_argument('--max-products-per-order', type=int, default=5)
+        parser.add_argument('--days', type=int, default=730,
+                            help="Spread created_at/order_date over this many days back")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for repeatable data")
+        parser.add_argument('--clear', action='store_true', help="Delete all CRM data first")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        inserted = seed(
+            customers=options['customers'],
+            products=options['products'],
+            orders=options['orders'],
+            max_products=options['max_products_per_order'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            seed=options['seed'],
+            clear=options['clear'],
+            log=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {inserted['customers']} customers, {inserted['products']} products "
+            f"and {inserted['orders']} orders in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from crm.reminders import dispatch_order_reminders
+
+
+class Command(BaseCommand):
+    help = "Email customers a reminder about orders placed in the last --days days"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        orders, emails = dispatch_order_reminders(
+            days=options['days'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Sent {emails} reminders covering {orders} orders"))
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# Trigram FTS5 tables over the searchable columns, kept in sync by triggers so
+# bulk_create, queryset.update() and raw deletes are covered as well as save()
+SEARCH_INDEXES = {
+    'crm_customer': ('crm_customer_search', ('name', 'email')),
+    'crm_product': ('crm_product_search', ('name',)),
+}
+
+
+def sqlite_statements(source, index, columns):
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {index} USING fts5({cols}, content='{source}', "
+        f"content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER {index}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {index}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {index}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER {index}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {index}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"INSERT INTO {index}({index}) VALUES ('rebuild')",
+    ]
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 34, 0):
+        for source, (index, columns) in SEARCH_INDEXES.items():
+            for statement in sqlite_statements(source, index, columns):
+                schema_editor.execute(statement)
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for source, (index, columns) in SEARCH_INDEXES.items():
+            for column in columns:
+                # Matches the UPPER(col::text) LIKE UPPER(...) Django emits for icontains
+                schema_editor.execute(
+                    f'CREATE INDEX {source}_{column}_trgm ON {source} '
+                    f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+                )
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 34, 0):
+        for source, (index, columns) in SEARCH_INDEXES.items():
+            for suffix in ('ai', 'ad', 'au'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {index}_{suffix}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {index}')
+    elif connection.vendor == 'postgresql':
+        for source, (index, columns) in SEARCH_INDEXES.items():
+            for column in columns:
+                schema_editor.execute(f'DROP INDEX IF EXISTS {source}_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0002_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
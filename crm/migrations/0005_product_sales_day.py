@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0004_order_date_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_days', to='crm.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='crm_sales_day_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='crm_sales_day_product_day_uniq')],
+            },
+        ),
+    ]
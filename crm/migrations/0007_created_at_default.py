@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0006_persisted_query'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# 0007 altered crm_customer and crm_product, which SQLite does by rebuilding
+# the tables; the rebuild drops the triggers 0003 created, and the FTS tables
+# miss every write made since. Any later AlterField on these tables needs the
+# same repair.
+search_indexes = import_module('crm.migrations.0003_search_indexes')
+
+
+def restore_search_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or connection.Database.sqlite_version_info < (3, 34, 0):
+        return
+    for source, (index, columns) in search_indexes.SEARCH_INDEXES.items():
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {index}_{suffix}')
+        # The FTS table survived the rebuild: recreate the triggers, then rebuild the index
+        for statement in search_indexes.sqlite_statements(source, index, columns)[1:]:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0007_created_at_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:58
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0008_restore_search_triggers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='created_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), editable=False),
+        ),
+    ]
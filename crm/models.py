@@ -1,10 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Now
+from django.utils import timezone
 
 class Customer(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # created_at range filters and (created_at, id) keyset pages
+            models.Index(fields=['created_at', 'id'], name='crm_customer_created_id_idx'),
+            # phone__startswith; the opclass makes LIKE 'x%' indexable on PostgreSQL
+            models.Index(fields=['phone'], name='crm_customer_phone_like_idx',
+                         opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return self.name
@@ -13,7 +27,16 @@ class Product(models.Model):
     name = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.IntegerField(default=0)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['price'], name='crm_product_price_idx'),
+            models.Index(fields=['stock'], name='crm_product_stock_idx'),
+            # Small partial index for the low-stock filter and restock job
+            models.Index(fields=['stock'], name='crm_product_low_stock_idx',
+                         condition=models.Q(stock__lt=10)),
+        ]
 
     def __str__(self):
         return self.name
@@ -22,7 +45,98 @@ class Order(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
     products = models.ManyToManyField(Product)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
-    order_date = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add, so bulk imports keep their dates
+    order_date = models.DateTimeField(default=timezone.now)
+    # When the row was inserted, set by the database in the same statement
+    # that assigns the ID (see settled_high_water)
+    created_at = models.DateTimeField(db_default=Now(), editable=False)
+
+    class Meta:
+        indexes = [
+            # order_date range filters and (order_date, id) keyset pages
+            models.Index(fields=['order_date', 'id'], name='crm_order_date_id_idx'),
+            # Per-customer recency checks (inactive customer cleanup, reminders)
+            models.Index(fields=['customer', 'order_date'], name='crm_order_customer_date_idx'),
+            models.Index(fields=['total_amount'], name='crm_order_total_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.id} - {self.customer.name}"
+
+class CustomerStats(models.Model):
+    """
+    Denormalized per-customer order aggregates, kept current by crm.signals
+    and rebuilt with `manage.py rebuild_customer_stats`
+    """
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, primary_key=True, related_name='stats'
+    )
+    order_count = models.PositiveIntegerField(default=0, db_index=True)
+    lifetime_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    last_order_date = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    def __str__(self):
+        return f"Stats for customer {self.customer_id}"
+
+class Watermark(models.Model):
+    """
+    Last processed row ID of an incremental background job, so reruns
+    pick up where the previous run stopped
+    """
+    name = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+def settled_high_water(queryset):
+    """
+    The highest ID in `queryset` a Watermark may move to. IDs are handed out
+    at insert but become visible at commit, so a lower ID can appear after a
+    higher one was processed. Rows inserted in the last
+    CRM_WATERMARK_SETTLE_SECONDS are left for the next run; every lower ID
+    was assigned earlier, and is assumed committed by now.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'CRM_WATERMARK_SETTLE_SECONDS', 60))
+    # IDs and insert times rise together: walk back from the newest ID
+    return (
+        queryset.filter(created_at__lte=cutoff).order_by('-id').values_list('id', flat=True).first()
+    )
+
+class PersistedQuery(models.Model):
+    """
+    A GraphQL query registered under the SHA-256 of its text: the persisted
+    query store and, with auto-registration off, the allowlist
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    query = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+class ProductSalesDay(models.Model):
+    """
+    Daily sales of one product, rolled up from orders by crm.rollup so
+    time series read one row per product and day instead of every order
+    """
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_days')
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves productId + day range reads
+            models.UniqueConstraint(fields=['product', 'day'], name='crm_sales_day_product_day_uniq'),
+        ]
+        indexes = [
+            # Time series over all products
+            models.Index(fields=['day'], name='crm_sales_day_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.units} units"
@@ -0,0 +1,123 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from graphene.relay import PageInfo
+
+KEYSET_CURSOR_PREFIX = 'keyset:'
+
+
+def parse_ordering(ordering):
+    """
+    Split ['-order_date', 'id'] into [('order_date', True), ('id', False)]
+    """
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(node, ordering):
+    """
+    Encode the sort key values of `node` as an opaque cursor
+    """
+    values = [encode_value(getattr(node, name)) for name, _ in ordering]
+    payload = KEYSET_CURSOR_PREFIX + json.dumps(values, separators=(',', ':'))
+    return base64.b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, model, ordering):
+    """
+    Decode a cursor back into sort key values typed for the model fields
+    """
+    try:
+        payload = base64.b64decode(cursor).decode()
+        if not payload.startswith(KEYSET_CURSOR_PREFIX):
+            raise ValueError
+        values = json.loads(payload[len(KEYSET_CURSOR_PREFIX):])
+        if len(values) != len(ordering):
+            raise ValueError
+        return [
+            model._meta.get_field(name).to_python(value)
+            for (name, _), value in zip(ordering, values)
+        ]
+    except (ValueError, ValidationError):
+        raise Exception(f"Invalid keyset cursor: {cursor}")
+
+
+def seek_filter(ordering, values, forward=True):
+    """
+    Build the WHERE clause for rows strictly after (or before) a sort key:
+    (a > x) OR (a = x AND b > y) OR ..., flipping the comparison for
+    descending columns
+    """
+    condition = Q()
+    equal = {}
+    for (name, descending), value in zip(ordering, values):
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def keyset_connection(connection, queryset, args, max_limit=None):
+    """
+    Build a Relay connection page by seeking from the cursor instead of
+    using OFFSET, so every page costs the same no matter how deep it is
+    """
+    if args.get('offset'):
+        raise Exception("offset cannot be combined with keyset pagination")
+
+    first = args.get('first')
+    last = args.get('last')
+    after = args.get('after')
+    before = args.get('before')
+    if first is None and last is None:
+        first = max_limit
+
+    ordering = parse_ordering(queryset.query.order_by)
+
+    if after:
+        queryset = queryset.filter(
+            seek_filter(ordering, decode_cursor(after, queryset.model, ordering))
+        )
+    if before:
+        queryset = queryset.filter(
+            seek_filter(ordering, decode_cursor(before, queryset.model, ordering), forward=False)
+        )
+
+    if last is not None and first is None:
+        # Walk backwards from the end (or from `before`) and flip the page
+        nodes = list(queryset.reverse()[:last + 1])
+        has_previous_page = len(nodes) > last
+        nodes = nodes[:last][::-1]
+        has_next_page = bool(before)
+    else:
+        nodes = list(queryset[:first + 1] if first is not None else queryset)
+        has_next_page = first is not None and len(nodes) > first
+        nodes = nodes[:first]
+        if last is not None:
+            nodes = nodes[-last:] if last else []
+        has_previous_page = bool(after)
+
+    edges = [
+        connection.Edge(node=node, cursor=encode_cursor(node, ordering))
+        for node in nodes
+    ]
+    page_info = PageInfo(
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None,
+        has_previous_page=has_previous_page,
+        has_next_page=has_next_page,
+    )
+    result = connection(edges=edges, page_info=page_info)
+    result.iterable = queryset
+    return result
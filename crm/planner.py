@@ -0,0 +1,137 @@
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.registry import get_global_registry
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def collect_fields(info, selection_set, fields=None):
+    """
+    Flatten a selection set into {field_name: [FieldNode, ...]},
+    expanding named and inline fragments along the way
+    """
+    if fields is None:
+        fields = {}
+    if selection_set is None:
+        return fields
+
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            fields.setdefault(selection.name.value, []).append(selection)
+        elif isinstance(selection, InlineFragmentNode):
+            collect_fields(info, selection.selection_set, fields)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = info.fragments.get(selection.name.value)
+            if fragment is not None:
+                collect_fields(info, fragment.selection_set, fields)
+    return fields
+
+
+def collect_node_fields(info, field_nodes):
+    """
+    Return the fields requested on the objects of a list or Relay connection field.
+    For connections the selection under `edges { node { ... } }` is used.
+    """
+    fields = {}
+    for field_node in field_nodes:
+        collect_fields(info, field_node.selection_set, fields)
+
+    if 'edges' in fields:
+        edge_fields = {}
+        for edge_node in fields['edges']:
+            collect_fields(info, edge_node.selection_set, edge_fields)
+        node_fields = {}
+        for node in edge_fields.get('node', []):
+            collect_fields(info, node.selection_set, node_fields)
+        return node_fields
+    return fields
+
+
+def model_fields(model):
+    """
+    Map the snake_case names graphene exposes to model fields
+    (reverse relations are exposed under their accessor, e.g. `order_set`)
+    """
+    fields = {}
+    for field in model._meta.get_fields():
+        if field.is_relation and field.auto_created and not field.concrete:
+            fields[field.get_accessor_name()] = field
+        else:
+            fields[field.name] = field
+    return fields
+
+
+def build_plan(info, model, fields, prefix=''):
+    """
+    Work out the columns, joins and prefetches a selection needs on `model`.
+    Returns (only, select_related, prefetch_related) with lookups relative to
+    the root model when `prefix` is set.
+    """
+    only = {prefix + model._meta.pk.attname}
+    select_related = []
+    prefetch_related = []
+    available = model_fields(model)
+    # Computed fields can declare the model path they read,
+    # e.g. field_paths = {'order_count': 'stats__order_count'}
+    object_type = get_global_registry().get_type_for_model(model)
+    field_paths = getattr(object_type, 'field_paths', {})
+
+    for name, field_nodes in fields.items():
+        snake_name = to_snake_case(name)
+        field = available.get(snake_name)
+        if field is None:
+            path = field_paths.get(snake_name)
+            if path:
+                relations = path.split('__')[:-1]
+                for depth in range(1, len(relations) + 1):
+                    select_related.append(prefix + '__'.join(relations[:depth]))
+                only.add(prefix + path)
+            # otherwise __typename or a field computed without database access
+            continue
+
+        sub_fields = collect_node_fields(info, field_nodes)
+
+        if field.is_relation and (field.many_to_one or field.one_to_one) and field.concrete:
+            only.add(prefix + field.attname)
+            related_only, related_select, related_prefetch = build_plan(
+                info, field.related_model, sub_fields, prefix=f'{prefix}{field.name}__'
+            )
+            only.update(related_only)
+            select_related.append(prefix + field.name)
+            select_related.extend(related_select)
+            prefetch_related.extend(related_prefetch)
+        elif field.is_relation and (field.many_to_many or field.one_to_many):
+            accessor = field.name if field.concrete else field.get_accessor_name()
+            # A reverse FK needs its column loaded to attach rows to their parent
+            required = [field.field.attname] if field.one_to_many else []
+            related_queryset = plan_queryset(
+                field.related_model._default_manager.all(), info,
+                fields=sub_fields, required=required
+            )
+            prefetch_related.append(
+                Prefetch(prefix + accessor, queryset=related_queryset)
+            )
+        elif field.concrete:
+            only.add(prefix + field.attname)
+
+    return only, select_related, prefetch_related
+
+
+def plan_queryset(queryset, info, fields=None, required=()):
+    """
+    Shape `queryset` from the GraphQL selection of the field being resolved:
+    join only the relations that were asked for and load only the columns
+    that were asked for (plus any `required` columns)
+    """
+    if fields is None:
+        fields = collect_node_fields(info, info.field_nodes)
+    if not fields:
+        return queryset
+
+    only, select_related, prefetch_related = build_plan(info, queryset.model, fields)
+    only.update(required)
+    queryset = queryset.only(*sorted(only))
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
@@ -0,0 +1,124 @@
+import json
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from .models import Customer, Order, Product
+
+CENT = Decimal('0.01')
+
+
+def money(value):
+    # SQLite sums decimals as floats
+    return str(Decimal(value).quantize(CENT))
+
+
+def report_spans(chunk_size, parallelism):
+    """
+    Split the current Order ID range into at most `parallelism` spans
+    [low, high] of whole `chunk_size` chunks, one per subtask. Orders
+    created after this call are left out of the report.
+    """
+    if chunk_size < 1 or parallelism < 1:
+        raise Exception("Chunk size and parallelism must be positive")
+    ids = Order.objects.aggregate(low=Min('id'), high=Max('id'))
+    if ids['low'] is None:
+        return []
+    chunks = (ids['high'] - ids['low']) // chunk_size + 1
+    per_span = -(-chunks // parallelism) * chunk_size
+    return [
+        (low, min(low + per_span - 1, ids['high']))
+        for low in range(ids['low'], ids['high'] + 1, per_span)
+    ]
+
+
+def partial_report(low, high, chunk_size):
+    """
+    Per-customer and per-product aggregates of the orders with IDs in
+    [low, high], read `chunk_size` IDs at a time. The result only holds
+    JSON types so it can travel through the result backend.
+
+    Product lines count one unit at the product's current price, like the
+    sales rollup.
+    """
+    customers = defaultdict(lambda: [0, Decimal(0)])
+    products = defaultdict(lambda: [0, Decimal(0)])
+    for start in range(low, high + 1, chunk_size):
+        end = min(start + chunk_size - 1, high)
+        for row in (
+            Order.objects.filter(id__gte=start, id__lte=end)
+            .values('customer_id')
+            .annotate(orders=Count('id'), revenue=Sum('total_amount'))
+            .order_by()
+        ):
+            totals = customers[row['customer_id']]
+            totals[0] += row['orders']
+            totals[1] += row['revenue']
+        for row in (
+            Order.products.through.objects.filter(order_id__gte=start, order_id__lte=end)
+            .values('product_id')
+            .annotate(units=Count('pk'), revenue=Sum('product__price'))
+            .order_by()
+        ):
+            totals = products[row['product_id']]
+            totals[0] += row['units']
+            totals[1] += row['revenue']
+
+    # JSON object keys are strings
+    return {
+        'customers': {str(pk): [count, money(revenue)] for pk, (count, revenue) in customers.items()},
+        'products': {str(pk): [units, money(revenue)] for pk, (units, revenue) in products.items()},
+    }
+
+
+def merge_reports(partials, top=10):
+    """
+    Merge partial_report() results into one report: totals, every customer
+    and product sorted by revenue, and the names of the `top` of each.
+    """
+    customers = defaultdict(lambda: [0, Decimal(0)])
+    products = defaultdict(lambda: [0, Decimal(0)])
+    for partial in partials:
+        for merged, part in ((customers, partial['customers']), (products, partial['products'])):
+            for pk, (count, revenue) in part.items():
+                merged[int(pk)][0] += count
+                merged[int(pk)][1] += Decimal(revenue)
+
+    customer_rows = sorted(customers.items(), key=lambda item: (-item[1][1], item[0]))
+    product_rows = sorted(products.items(), key=lambda item: (-item[1][1], item[0]))
+    customer_names = dict(
+        Customer.objects.filter(id__in=[pk for pk, _ in customer_rows[:top]]).values_list('id', 'name')
+    )
+    product_names = dict(
+        Product.objects.filter(id__in=[pk for pk, _ in product_rows[:top]]).values_list('id', 'name')
+    )
+
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'customers_with_orders': len(customers),
+        'total_orders': sum(count for count, _ in customers.values()),
+        'total_revenue': money(sum((revenue for _, revenue in customers.values()), Decimal(0))),
+        'top_customers': [
+            {'id': pk, 'name': customer_names.get(pk), 'orders': count, 'revenue': money(revenue)}
+            for pk, (count, revenue) in customer_rows[:top]
+        ],
+        'top_products': [
+            {'id': pk, 'name': product_names.get(pk), 'units': units, 'revenue': money(revenue)}
+            for pk, (units, revenue) in product_rows[:top]
+        ],
+        'customers': [
+            {'id': pk, 'orders': count, 'revenue': money(revenue)}
+            for pk, (count, revenue) in customer_rows
+        ],
+        'products': [
+            {'id': pk, 'units': units, 'revenue': money(revenue)}
+            for pk, (units, revenue) in product_rows
+        ],
+    }
+
+
+def write_report(report, path):
+    with open(path, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
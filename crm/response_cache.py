@@ -0,0 +1,112 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, transaction
+from graphql import TypeInfo, TypeInfoVisitor, Visitor, get_named_type, print_ast, visit
+
+from .routers import replica_cache_timeout
+
+RESPONSE_CACHE_PREFIX = 'crm:response:'
+TAG_VERSION_PREFIX = 'crm:response-tag:'
+
+
+def get_cache():
+    """
+    The Django cache holding responses. Defaults to the `default` alias
+    (local memory); point CRM_RESPONSE_CACHE_ALIAS at a Redis or Memcached
+    alias to share entries between processes.
+    """
+    return caches[getattr(settings, 'CRM_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def model_tag(model):
+    return model._meta.label
+
+
+def document_models(schema, document):
+    """
+    Models an operation reads: the Django model behind every object type it
+    selects, plus anything a type declares in `cache_models` (for fields that
+    are computed from other tables)
+    """
+    type_info = TypeInfo(schema)
+    models = set()
+
+    class CollectModels(Visitor):
+        def enter_field(self, node, *args):
+            graphene_type = getattr(get_named_type(type_info.get_type()), 'graphene_type', None)
+            model = getattr(getattr(graphene_type, '_meta', None), 'model', None)
+            if model is not None:
+                models.add(model)
+            models.update(getattr(graphene_type, 'cache_models', ()))
+
+    visit(document, TypeInfoVisitor(type_info, CollectModels()))
+    return models
+
+
+def response_key(document, operation_name, variables, using=None):
+    # Replicas may lag behind the primary, so each database caches its own responses
+    normalized = json.dumps(
+        [print_ast(document), operation_name, variables or {}, using or DEFAULT_DB_ALIAS],
+        sort_keys=True, cls=DjangoJSONEncoder
+    )
+    return RESPONSE_CACHE_PREFIX + hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def tag_versions(tags):
+    cache = get_cache()
+    keys = {TAG_VERSION_PREFIX + tag: tag for tag in tags}
+    current = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in current]
+    if missing:
+        # Seed with a clock value so a tag evicted from the cache never
+        # comes back with a version an old entry was stored under
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        current.update(cache.get_many(missing))
+    return {tag: current.get(key) for key, tag in keys.items()}
+
+
+def get_response(key, versions):
+    """
+    Return the cached data for `key`, or None when it is missing or one of
+    its models has been written since it was stored. `versions` comes from
+    tag_versions() and must be read before executing the operation.
+    """
+    entry = get_cache().get(key)
+    if entry is None or entry['versions'] != versions:
+        return None
+    return entry['data']
+
+
+def set_response(key, versions, data, using=None):
+    """
+    Store `data` read from database `using` (see crm.routers.replica_cache_timeout)
+    """
+    get_cache().set(
+        key,
+        {'versions': versions, 'data': data},
+        replica_cache_timeout(using, getattr(settings, 'CRM_RESPONSE_CACHE_TTL', 30)),
+    )
+
+
+def invalidate_models(*models):
+    """
+    Bump the version of each model's tag once the current transaction commits,
+    which orphans every cached response that read it
+    """
+    def bump():
+        cache = get_cache()
+        for model in models:
+            key = TAG_VERSION_PREFIX + model_tag(model)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Never read (or evicted): any fresh version will do
+                cache.set(key, time.time_ns(), timeout=None)
+
+    transaction.on_commit(bump)
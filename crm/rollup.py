@@ -0,0 +1,199 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+
+from .models import Order, ProductSalesDay, Watermark, settled_high_water
+from .response_cache import invalidate_models
+
+WATERMARK_NAME = 'sales_rollup'
+
+BUCKETS = {
+    'day': F('day'),
+    'week': TruncWeek('day'),
+    'month': TruncMonth('day'),
+}
+
+
+def order_lines(low, high):
+    """
+    Sales per (day, product) of the orders with IDs in (low, high].
+
+    The through table has no quantity or sale price, so each order line
+    counts as one unit at the product's current price.
+    """
+    return (
+        Order.products.through.objects
+        .filter(order_id__gt=low, order_id__lte=high)
+        .annotate(day=TruncDate('order__order_date'))
+        .values('day', 'product_id')
+        .annotate(
+            units=Count('pk'),
+            revenue=Sum('product__price'),
+            order_count=Count('order_id', distinct=True),
+        )
+        .order_by()
+    )
+
+
+def add_to_rollup(lines):
+    """
+    Add per (day, product) totals to the rollup rows, creating missing ones
+    """
+    totals = {(line['product_id'], line['day']): line for line in lines}
+    if not totals:
+        return 0
+    existing = ProductSalesDay.objects.filter(
+        product_id__in={product_id for product_id, _ in totals},
+        day__in={day for _, day in totals},
+    )
+    rows = {(row.product_id, row.day): row for row in existing}
+    for key, line in totals.items():
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = ProductSalesDay(product_id=key[0], day=key[1])
+        row.units += line['units']
+        row.revenue += line['revenue']
+        row.order_count += line['order_count']
+
+    # The lookup above may pick up extra (product, day) pairs; only write ours
+    ProductSalesDay.objects.bulk_create(
+        [rows[key] for key in totals],
+        update_conflicts=True,
+        unique_fields=['product', 'day'],
+        update_fields=['units', 'revenue', 'order_count'],
+    )
+    return len(totals)
+
+
+def update_sales_rollup(batch_size=10000):
+    """
+    Fold the orders created since the last run into the rollup, in
+    transactions of `batch_size` order IDs that also advance the watermark,
+    so every order is counted exactly once. Orders are picked up
+    CRM_WATERMARK_SETTLE_SECONDS after they are inserted, so a lower ID that
+    commits late isn't passed over. Returns the rollup rows written.
+
+    Orders deleted or changed after they were rolled up are only corrected
+    by rebuild_sales_rollup().
+    """
+    watermark, _ = Watermark.objects.get_or_create(name=WATERMARK_NAME)
+    high_water = settled_high_water(Order.objects.filter(id__gt=watermark.value))
+    if high_water is None:
+        return 0
+
+    written = 0
+    low = watermark.value
+    while low < high_water:
+        high = min(low + batch_size, high_water)
+        with transaction.atomic():
+            # Locked, so an overlapping run can't add the same orders twice
+            watermark = Watermark.objects.select_for_update().get(pk=watermark.pk)
+            if watermark.value != low:
+                break
+            written += add_to_rollup(order_lines(low, high))
+            watermark.value = high
+            watermark.save(update_fields=['value', 'updated_at'])
+        low = high
+
+    invalidate_models(ProductSalesDay)
+    return written
+
+
+def rebuild_sales_rollup(batch_size=10000):
+    """
+    Recompute the whole rollup from the Order table.
+    Returns the number of rows written.
+    """
+    written = 0
+    with transaction.atomic():
+        watermark, _ = Watermark.objects.select_for_update().get_or_create(name=WATERMARK_NAME)
+        # Newer orders are left to update_sales_rollup()
+        high_water = settled_high_water(Order.objects.all()) or 0
+        ProductSalesDay.objects.all().delete()
+        batch = []
+        for line in order_lines(0, high_water).iterator(chunk_size=batch_size):
+            batch.append(ProductSalesDay(**line))
+            if len(batch) >= batch_size:
+                ProductSalesDay.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            ProductSalesDay.objects.bulk_create(batch)
+            written += len(batch)
+        watermark.value = high_water
+        watermark.save(update_fields=['value', 'updated_at'])
+    invalidate_models(ProductSalesDay)
+    return written
+
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, bucket):
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def bucket_count(start, end, bucket):
+    if bucket == 'week':
+        return (end - bucket_start(start, bucket)).days // 7 + 1
+    if bucket == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return (end - start).days + 1
+
+
+def sales_timeseries(start, end, bucket='day', product_id=None):
+    """
+    Units, revenue and order count per bucket ('day', 'week' or 'month')
+    between the `start` and `end` dates, for one product or all of them.
+    Reads the rollup only; every bucket in the range is returned, empty
+    ones with zeros, so ranges over CRM_TIMESERIES_MAX_BUCKETS buckets
+    are refused.
+    """
+    if bucket not in BUCKETS:
+        raise Exception(f"Unknown bucket {bucket!r}, use one of {', '.join(BUCKETS)}")
+    if start > end:
+        raise Exception("The start date must not be after the end date")
+    max_buckets = getattr(settings, 'CRM_TIMESERIES_MAX_BUCKETS', 1000)
+    if bucket_count(start, end, bucket) > max_buckets:
+        raise Exception(
+            f"The range spans more than {max_buckets} {bucket} buckets; "
+            f"narrow it or use a larger bucket"
+        )
+
+    days = ProductSalesDay.objects.filter(day__range=(start, end))
+    if product_id is not None:
+        days = days.filter(product_id=product_id)
+    totals = {
+        row['bucket']: row
+        for row in days.annotate(bucket=BUCKETS[bucket])
+        .values('bucket')
+        .annotate(units=Sum('units'), revenue=Sum('revenue'), order_count=Sum('order_count'))
+        .order_by()
+    }
+
+    points = []
+    current = bucket_start(start, bucket)
+    while current <= end:
+        row = totals.get(current, {})
+        points.append({
+            'start': current,
+            'units': row.get('units', 0),
+            # SQLite sums decimals as floats
+            'revenue': row.get('revenue', Decimal('0')).quantize(Decimal('0.01')),
+            'order_count': row.get('order_count', 0),
+        })
+        current = next_bucket(current, bucket)
+    return points
@@ -0,0 +1,148 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Replica alias reads go to, chosen once per operation by read_from_replica().
+# A context variable follows the operation into sync_to_async threads and
+# keeps concurrent operations of an async batch apart.
+current_replica = ContextVar('crm_replica', default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'CRM_DATABASE_REPLICAS', ()))
+
+
+def replica_down_key(alias):
+    return f'crm:replica-down:{alias}'
+
+
+def healthy_replicas():
+    aliases = replica_aliases()
+    if not aliases:
+        return []
+    down = cache.get_many([replica_down_key(alias) for alias in aliases])
+    return [alias for alias in aliases if replica_down_key(alias) not in down]
+
+
+def mark_replica_down(alias, seconds=None):
+    """
+    Take a replica out of rotation for `seconds` (default
+    CRM_REPLICA_RETRY_SECONDS), or until mark_replica_up()
+    """
+    seconds = seconds if seconds is not None else getattr(settings, 'CRM_REPLICA_RETRY_SECONDS', 60)
+    cache.set(replica_down_key(alias), True, seconds)
+
+
+def mark_replica_up(alias):
+    cache.delete(replica_down_key(alias))
+
+
+def check_replicas():
+    """
+    Run a trivial query on every replica and update its health mark.
+    Returns {alias: healthy}.
+    """
+    health = {}
+    for alias in replica_aliases():
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+            health[alias] = True
+            mark_replica_up(alias)
+        except DatabaseError:
+            health[alias] = False
+            mark_replica_down(alias)
+            connections[alias].close()
+    return health
+
+
+def choose_replica():
+    """
+    A healthy replica alias, or None to read from the primary
+    """
+    replicas = healthy_replicas()
+    return random.choice(replicas) if replicas else None
+
+
+@contextmanager
+def read_from_replica():
+    """
+    Route the reads made inside the block to one healthy replica. Writes
+    still go to the primary; with no healthy replica reads do too.
+    """
+    token = current_replica.set(choose_replica())
+    try:
+        yield current_replica.get()
+    finally:
+        current_replica.reset(token)
+
+
+def replica_cache_timeout(using, timeout):
+    """
+    Cap the cache timeout of a result read from `using`. A lagging replica
+    can serve pre-write rows after the write has invalidated the cache, so
+    results read from a replica are kept for at most CRM_REPLICA_CACHE_TTL
+    seconds (default CRM_READ_YOUR_WRITES_SECONDS, the lag clients are
+    already shielded from).
+    """
+    if using is None or using == DEFAULT_DB_ALIAS:
+        return timeout
+    limit = getattr(settings, 'CRM_REPLICA_CACHE_TTL', getattr(settings, 'CRM_READ_YOUR_WRITES_SECONDS', 5))
+    return limit if timeout is None else min(timeout, limit)
+
+
+def read_your_writes_cookie():
+    return getattr(settings, 'CRM_READ_YOUR_WRITES_COOKIE', 'crm_primary_until')
+
+
+def pinned_to_primary(request):
+    """
+    Whether the client wrote, in this request or recently enough that
+    replicas may not have its changes yet (see pin_to_primary)
+    """
+    if not replica_aliases():
+        return False
+    if getattr(request, 'crm_wrote', False):
+        return True
+    try:
+        return float(request.COOKIES.get(read_your_writes_cookie(), 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def pin_to_primary(response):
+    """
+    Send the client's reads to the primary for CRM_READ_YOUR_WRITES_SECONDS.
+    The cookie only ever moves reads to the primary, so it needs no signing.
+    """
+    seconds = getattr(settings, 'CRM_READ_YOUR_WRITES_SECONDS', 5)
+    if replica_aliases() and seconds:
+        response.set_cookie(
+            read_your_writes_cookie(), f'{time.time() + seconds:.3f}',
+            max_age=seconds, httponly=True, samesite='Lax',
+        )
+
+
+class ReplicaRouter:
+    """
+    Sends reads inside read_from_replica() to its replica and every write,
+    and all other reads, to the primary (the `default` database)
+    """
+
+    def db_for_read(self, model, **hints):
+        return current_replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the primary's rows
+        aliases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
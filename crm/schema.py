@@ -1,30 +1,124 @@
 import graphene
-from graphene_django import DjangoObjectType, DjangoFilterConnectionField
-from django.db import transaction
-from django.db.models import Q
-from .models import Customer, Product, Order
+from asgiref.sync import sync_to_async
+from collections import Counter
+from decimal import Decimal
+from graphene_django import DjangoObjectType
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Q, Sum, Value, When
+from .models import Customer, CustomerStats, Product, ProductSalesDay, Order
+from .aio import alist, is_async, sync_resolver
+from .fields import CRMConnectionField
 from .filters import CustomerFilter, ProductFilter, OrderFilter
-from crm.models import Product
+from .imports import import_order_chunks
+from .inventory import restock_low_stock
+from .loaders import get_loaders
+from .planner import collect_fields, collect_node_fields, plan_queryset
+from .response_cache import invalidate_models
+from .rollup import sales_timeseries
+from .stats import acrm_statistics, crm_statistics, invalidate_crm_statistics
+
+def stats_value(customer, name, default):
+    stats = getattr(customer, 'stats', None)
+    return getattr(stats, name) if stats else default
+
+def resolve_stats_value(customer, info, name, default):
+    """
+    A CustomerStats column, or `default` for customers that never ordered.
+    Under the async view a stats row that wasn't joined is read off the event loop.
+    """
+    if is_async(info) and not Customer.stats.is_cached(customer):
+        return sync_to_async(stats_value)(customer, name, default)
+    return stats_value(customer, name, default)
 
 # Types with Node for filtering
 class CustomerType(DjangoObjectType):
+    order_count = graphene.Int()
+    lifetime_revenue = graphene.Decimal()
+    last_order_date = graphene.DateTime()
+
     class Meta:
         model = Customer
         interfaces = (graphene.relay.Node,)
         fields = "__all__"
 
+    # Lets the query planner join CustomerStats for the fields above,
+    # and the response cache know they are read from it
+    cache_models = (CustomerStats,)
+    field_paths = {
+        'order_count': 'stats__order_count',
+        'lifetime_revenue': 'stats__lifetime_revenue',
+        'last_order_date': 'stats__last_order_date',
+    }
+
+    def resolve_order_count(self, info):
+        return resolve_stats_value(self, info, 'order_count', 0)
+
+    def resolve_lifetime_revenue(self, info):
+        return resolve_stats_value(self, info, 'lifetime_revenue', Decimal('0.00'))
+
+    def resolve_last_order_date(self, info):
+        return resolve_stats_value(self, info, 'last_order_date', None)
+
 class ProductType(DjangoObjectType):
     class Meta:
         model = Product
         interfaces = (graphene.relay.Node,)
         fields = "__all__"
 
+class CRMStatisticsType(graphene.ObjectType):
+    cache_models = (Customer, Order)
+
+    total_customers = graphene.Int()
+    total_orders = graphene.Int()
+    total_revenue = graphene.Decimal()
+    computed_at = graphene.DateTime()
+
+class SalesBucket(graphene.Enum):
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+
+class SalesPointType(graphene.ObjectType):
+    """
+    Sales in the bucket starting on `start`. Over all products, orderCount
+    counts an order once for every product it contains.
+    """
+    cache_models = (ProductSalesDay,)
+
+    start = graphene.Date()
+    units = graphene.Int()
+    revenue = graphene.Decimal()
+    order_count = graphene.Int()
+
 class OrderType(DjangoObjectType):
     class Meta:
         model = Order
         interfaces = (graphene.relay.Node,)
         fields = "__all__"
 
+    @classmethod
+    def prime_loaders(cls, orders, info, field_nodes=None):
+        loaders = get_loaders(info.context)
+        fields = collect_node_fields(info, field_nodes or info.field_nodes)
+        if is_async(info):
+            # Nested resolvers run on the event loop and can't query, so load
+            # the selected relations now while still in the sync thread
+            loaders.load_orders(orders, fields)
+        else:
+            loaders.prime_orders(orders, fields)
+
+    def resolve_customer(self, info):
+        # Joined in by the query planner, otherwise batched across the page
+        if Order.customer.is_cached(self):
+            return self.customer
+        return get_loaders(info.context).customer.load(self.customer_id)
+
+    def resolve_products(self, info, **kwargs):
+        if 'products' in getattr(self, '_prefetched_objects_cache', {}):
+            return self.products.all()
+        return get_loaders(info.context).order_products.load(self.pk)
+
 # Input Types (keep existing)
 class CustomerInput(graphene.InputObjectType):
     name = graphene.String(required=True)
@@ -50,6 +144,14 @@ class CustomerFilterInput(graphene.InputObjectType):
     created_at_gte = graphene.Date()
     created_at_lte = graphene.Date()
     phone_pattern = graphene.String()
+    order_count_gte = graphene.Int()
+    order_count_lte = graphene.Int()
+    lifetime_revenue_gte = graphene.Decimal()
+    lifetime_revenue_lte = graphene.Decimal()
+    last_order_date_gte = graphene.Date()
+    last_order_date_lte = graphene.Date()
+    no_orders_since = graphene.Date()
+    search = graphene.String()
 
 class ProductFilterInput(graphene.InputObjectType):
     name = graphene.String()
@@ -59,6 +161,7 @@ class ProductFilterInput(graphene.InputObjectType):
     stock_gte = graphene.Int()
     stock_lte = graphene.Int()
     low_stock = graphene.Boolean()
+    search = graphene.String()
 
 class OrderFilterInput(graphene.InputObjectType):
     total_amount_gte = graphene.Decimal()
@@ -70,6 +173,7 @@ class OrderFilterInput(graphene.InputObjectType):
     product_name = graphene.String()
     product_name_icontains = graphene.String()
     product_id = graphene.ID()
+    search = graphene.String()
 
 # Keep existing Mutations (CreateCustomer, BulkCreateCustomers, CreateProduct, CreateOrder)
 class CreateCustomer(graphene.Mutation):
@@ -80,50 +184,100 @@ class CreateCustomer(graphene.Mutation):
     message = graphene.String()
 
     def mutate(self, info, input):
+        if is_async(info):
+            return CreateCustomer.mutate_async(input)
+
         if Customer.objects.filter(email=input.email).exists():
             raise Exception("Email already exists")
         
+        customer = CreateCustomer.build_customer(input)
+        customer.save()
+        
+        return CreateCustomer(customer=customer, message="Customer created successfully")
+
+    @staticmethod
+    async def mutate_async(input):
+        if await Customer.objects.filter(email=input.email).aexists():
+            raise Exception("Email already exists")
+
+        customer = CreateCustomer.build_customer(input)
+        await customer.asave()
+
+        return CreateCustomer(customer=customer, message="Customer created successfully")
+
+    @staticmethod
+    def build_customer(input):
         if input.phone and not any(c.isdigit() for c in input.phone.replace('-', '').replace('+', '')):
             raise Exception("Invalid phone format")
         
-        customer = Customer(
+        return Customer(
             name=input.name,
             email=input.email,
             phone=input.phone
         )
-        customer.save()
-        
-        return CreateCustomer(customer=customer, message="Customer created successfully")
 
 class BulkCreateCustomers(graphene.Mutation):
     class Arguments:
         inputs = graphene.List(CustomerInput, required=True)
+        chunk_size = graphene.Int()
 
     customers = graphene.List(CustomerType)
     errors = graphene.List(graphene.String)
 
-    @transaction.atomic
-    def mutate(self, info, inputs):
+    @sync_resolver
+    def mutate(self, info, inputs, chunk_size=None):
+        chunk_size = chunk_size or getattr(settings, 'CRM_BULK_CREATE_CHUNK_SIZE', 1000)
+        if chunk_size < 1:
+            raise Exception("Chunk size must be positive")
+
         customers = []
         errors = []
-        
-        for i, input_data in enumerate(inputs):
-            try:
-                if Customer.objects.filter(email=input_data.email).exists():
+        seen_emails = set()
+
+        for start in range(0, len(inputs), chunk_size):
+            chunk = list(enumerate(inputs[start:start + chunk_size], start=start))
+
+            # One set query per chunk for emails that already exist
+            existing = set(
+                Customer.objects.filter(
+                    email__in=[input_data.email for _, input_data in chunk]
+                ).values_list('email', flat=True)
+            )
+
+            rows = []
+            for i, input_data in chunk:
+                if input_data.email in existing:
                     errors.append(f"Row {i+1}: Email {input_data.email} already exists")
                     continue
-                
-                customer = Customer(
+                if input_data.email in seen_emails:
+                    errors.append(f"Row {i+1}: Email {input_data.email} is duplicated in this batch")
+                    continue
+                seen_emails.add(input_data.email)
+                rows.append((i, Customer(
                     name=input_data.name,
                     email=input_data.email,
                     phone=input_data.phone
-                )
-                customer.save()
-                customers.append(customer)
-                
-            except Exception as e:
-                errors.append(f"Row {i+1}: {str(e)}")
-        
+                )))
+
+            try:
+                with transaction.atomic():
+                    customers.extend(Customer.objects.bulk_create([c for _, c in rows]))
+            except IntegrityError:
+                # Lost a race with a concurrent insert: retry row by row to report it
+                for i, customer in rows:
+                    try:
+                        with transaction.atomic():
+                            customer.pk = None
+                            customer.save()
+                        customers.append(customer)
+                    except Exception as e:
+                        errors.append(f"Row {i+1}: {str(e)}")
+
+        if customers:
+            # bulk_create skips the post_save handlers
+            invalidate_crm_statistics()
+            invalidate_models(Customer)
+
         return BulkCreateCustomers(customers=customers, errors=errors)
 
 class CreateProduct(graphene.Mutation):
@@ -145,69 +299,175 @@ class CreateProduct(graphene.Mutation):
             price=input.price,
             stock=stock
         )
+        if is_async(info):
+            return CreateProduct.save_async(product)
         product.save()
         
         return CreateProduct(product=product)
 
+    @staticmethod
+    async def save_async(product):
+        await product.asave()
+        return CreateProduct(product=product)
+
 class CreateOrder(graphene.Mutation):
     class Arguments:
         input = OrderInput(required=True)
 
     order = graphene.Field(OrderType)
 
+    @sync_resolver
+    @transaction.atomic
     def mutate(self, info, input):
-        try:
-            customer = Customer.objects.get(id=input.customer_id)
-        except Customer.DoesNotExist:
+        customer = Customer.objects.filter(id=input.customer_id).first()
+        if customer is None:
             raise Exception("Customer does not exist")
-        
-        products = []
+
+        if not input.product_ids:
+            raise Exception("At least one product is required")
+
+        # Repeating a product ID orders more than one unit of it
+        quantities = Counter()
         for product_id in input.product_ids:
             try:
-                product = Product.objects.get(id=product_id)
-                products.append(product)
-            except Product.DoesNotExist:
+                quantities[int(product_id)] += 1
+            except (TypeError, ValueError):
                 raise Exception(f"Product with ID {product_id} does not exist")
-        
-        if not products:
-            raise Exception("At least one product is required")
-        
-        total_amount = sum(product.price for product in products)
-        
-        order = Order(
-            customer=customer,
-            total_amount=total_amount
+
+        products = Product.objects.in_bulk(list(quantities))
+        for product_id in quantities:
+            if product_id not in products:
+                raise Exception(f"Product with ID {product_id} does not exist")
+
+        # Reserve stock with a single conditional UPDATE ... WHERE stock >= n,
+        # so concurrent checkouts can never take a product below zero
+        needed = Case(
+            *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+            output_field=IntegerField()
         )
-        order.save()
-        order.products.set(products)
-        
+        reserved = Product.objects.filter(id__in=list(quantities), stock__gte=needed).update(
+            stock=F('stock') - needed
+        )
+        if reserved != len(quantities):
+            # The partial update is rolled back; name the products from the snapshot
+            short = [
+                product.name for pk, product in products.items() if product.stock < quantities[pk]
+            ] or [product.name for product in products.values()]
+            raise Exception(f"Insufficient stock for: {', '.join(short)}")
+
+        # SQLite sums decimals as floats
+        total_amount = Product.objects.filter(id__in=list(quantities)).aggregate(
+            total=Sum(F('price') * needed, output_field=DecimalField(max_digits=10, decimal_places=2))
+        )['total'].quantize(Decimal('0.01'))
+
+        order = Order.objects.create(customer=customer, total_amount=total_amount)
+        Order.products.through.objects.bulk_create([
+            Order.products.through(order_id=order.id, product_id=product_id)
+            for product_id in quantities
+        ])
+        # The stock UPDATE and through-table insert skip the model signals
+        invalidate_models(Product, Order)
+
+        if is_async(info):
+            order_nodes = []
+            for field_node in info.field_nodes:
+                order_nodes.extend(collect_fields(info, field_node.selection_set).get('order', []))
+            OrderType.prime_loaders([order], info, order_nodes)
+
         return CreateOrder(order=order)
 
+class BulkCreateOrders(graphene.Mutation):
+    class Arguments:
+        inputs = graphene.List(OrderInput, required=True)
+        chunk_size = graphene.Int()
+
+    orders = graphene.List(OrderType)
+    errors = graphene.List(graphene.String)
+
+    @sync_resolver
+    def mutate(self, info, inputs, chunk_size=None):
+        """
+        Import orders in chunks (see crm.imports): invalid rows are reported
+        in `errors` and the rest are created. Stock is left untouched.
+        """
+        chunk_size = chunk_size or getattr(settings, 'CRM_BULK_CREATE_CHUNK_SIZE', 1000)
+        orders = []
+        errors = []
+        for created, chunk_errors in import_order_chunks(inputs, chunk_size=chunk_size):
+            orders.extend(created)
+            errors.extend(chunk_errors)
+
+        if orders:
+            order_nodes = []
+            for field_node in info.field_nodes:
+                order_nodes.extend(collect_fields(info, field_node.selection_set).get('orders', []))
+            OrderType.prime_loaders(orders, info, order_nodes)
+
+        return BulkCreateOrders(orders=orders, errors=errors)
+
+class UpdateLowStockProducts(graphene.Mutation):
+    class Arguments:
+        threshold = graphene.Int()
+        increment = graphene.Int()
+
+    updated_products = graphene.List(ProductType)
+    message = graphene.String()
+    success = graphene.Boolean()
+
+    @sync_resolver
+    def mutate(self, info, threshold=None, increment=None):
+        threshold = threshold if threshold is not None else getattr(settings, 'CRM_LOW_STOCK_THRESHOLD', 10)
+        increment = increment if increment is not None else getattr(settings, 'CRM_LOW_STOCK_INCREMENT', 10)
+        try:
+            if increment <= 0:
+                raise Exception("Increment must be positive")
+
+            # One UPDATE ... RETURNING where supported, so the products reported
+            # are exactly the ones restocked
+            updated_products = restock_low_stock(threshold=threshold, increment=increment)
+            
+            return UpdateLowStockProducts(
+                updated_products=updated_products,
+                message=f"Successfully updated {len(updated_products)} low-stock products",
+                success=True
+            )
+            
+        except Exception as e:
+            return UpdateLowStockProducts(
+                updated_products=[],
+                message=f"Error updating low-stock products: {str(e)}",
+                success=False
+            )
+
 class Mutation(graphene.ObjectType):
     create_customer = CreateCustomer.Field()
     bulk_create_customers = BulkCreateCustomers.Field()
     create_product = CreateProduct.Field()
     create_order = CreateOrder.Field()
+    bulk_create_orders = BulkCreateOrders.Field()
+    update_low_stock_products = UpdateLowStockProducts.Field()
 
 # Updated Query with Filtering
 class Query(graphene.ObjectType):
     # Filtered queries with relay nodes
-    all_customers = DjangoFilterConnectionField(
+    all_customers = CRMConnectionField(
         CustomerType, 
         filterset_class=CustomerFilter,
-        order_by=graphene.List(of_type=graphene.String)
+        order_by=graphene.List(of_type=graphene.String),
+        keyset_ordering=('created_at', 'id')
     )
     
-    all_products = DjangoFilterConnectionField(
+    all_products = CRMConnectionField(
         ProductType,
         filterset_class=ProductFilter,
         order_by=graphene.List(of_type=graphene.String)
     )
     
-    all_orders = DjangoFilterConnectionField(
+    all_orders = CRMConnectionField(
         OrderType,
         filterset_class=OrderFilter,
-        order_by=graphene.List(of_type=graphene.String)
+        order_by=graphene.List(of_type=graphene.String),
+        keyset_ordering=('order_date', 'id')
     )
     
     # Simple non-filtered queries (keep for backward compatibility)
@@ -215,62 +475,52 @@ class Query(graphene.ObjectType):
     products = graphene.List(ProductType)
     orders = graphene.List(OrderType)
     
+    # Aggregates for reports, cached server-side
+    crm_statistics = graphene.Field(CRMStatisticsType)
+    
+    # Reads the daily rollup maintained by crm.rollup, one row per product and day
+    sales_timeseries = graphene.List(
+        SalesPointType,
+        product_id=graphene.ID(),
+        from_=graphene.Date(required=True, name='from'),
+        to=graphene.Date(required=True),
+        bucket=SalesBucket(default_value='day'),
+    )
+    
+    # Under the async view these use the async ORM, so independent root
+    # fields of one operation resolve concurrently
+    def resolve_crm_statistics(self, info):
+        if is_async(info):
+            return acrm_statistics()
+        return crm_statistics()
+    
+    def resolve_sales_timeseries(self, info, from_, to, product_id=None, bucket='day'):
+        bucket = getattr(bucket, 'value', bucket)
+        if is_async(info):
+            return sync_to_async(sales_timeseries)(from_, to, bucket=bucket, product_id=product_id)
+        return sales_timeseries(from_, to, bucket=bucket, product_id=product_id)
+    
     def resolve_customers(self, info):
-        return Customer.objects.all()
+        customers = plan_queryset(Customer.objects.all(), info)
+        if is_async(info):
+            return alist(customers)
+        return customers
     
     def resolve_products(self, info):
-        return Product.objects.all()
+        products = plan_queryset(Product.objects.all(), info)
+        if is_async(info):
+            return alist(products)
+        return products
     
     def resolve_orders(self, info):
-        return Order.objects.all()
-
-import graphene
-from graphene_django import DjangoObjectType
-from django.db.models import F
-from products.models import Product  # Adjust import based on your app structure
-
-class ProductType(DjangoObjectType):
-    class Meta:
-        model = Product
-        fields = ("id", "name", "stock")
-
-class UpdateLowStockProducts(graphene.Mutation):
-    class Arguments:
-        pass
-
-    updated_products = graphene.List(ProductType)
-    message = graphene.String()
-    success = graphene.Boolean()
-
-    def mutate(self, info):
-        try:
-            # Query products with stock < 10
-            low_stock_products = Product.objects.filter(stock__lt=10)
-            
-            # Update stock by incrementing by 10
-            updated_count = low_stock_products.update(stock=F('stock') + 10)
-            
-            # Fetch the updated products
-            updated_products = Product.objects.filter(
-                id__in=low_stock_products.values_list('id', flat=True)
-            )
-            
-            return UpdateLowStockProducts(
-                updated_products=updated_products,
-                message=f"Successfully updated {updated_count} low-stock products",
-                success=True
-            )
-            
-        except Exception as e:
-            return UpdateLowStockProducts(
-                updated_products=[],
-                message=f"Error updating low-stock products: {str(e)}",
-                success=False
-            )
-
-class Mutation(graphene.ObjectType):
-    update_low_stock_products = UpdateLowStockProducts.Field()
+        if is_async(info):
+            return Query.resolve_orders_async(info)
+        orders = list(plan_queryset(Order.objects.all(), info))
+        OrderType.prime_loaders(orders, info)
+        return orders
 
-# Add this to your existing schema if you have other mutations
-# class Mutation(graphene.ObjectType, ...):
-#     update_low_stock_products = UpdateLowStockProducts.Field()
+    @staticmethod
+    async def resolve_orders_async(info):
+        orders = await alist(plan_queryset(Order.objects.all(), info))
+        await sync_to_async(OrderType.prime_loaders)(orders, info)
+        return orders
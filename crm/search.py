@@ -0,0 +1,97 @@
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Customer, Order, Product
+
+# Model -> (FTS5 table on SQLite, indexed columns)
+SEARCH_INDEXES = {
+    Customer: ('crm_customer_search', ('name', 'email')),
+    Product: ('crm_product_search', ('name',)),
+}
+
+# The trigram tokenizer cannot match terms shorter than one trigram
+MIN_TRIGRAM_LENGTH = 3
+
+
+def search_backend(connection):
+    """
+    'fts5' for SQLite with the trigram tokenizer, 'trigram' for PostgreSQL
+    (pg_trgm GIN indexes), None when substring search is a plain scan
+    """
+    if connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 34, 0):
+        return 'fts5'
+    if connection.vendor == 'postgresql':
+        return 'trigram'
+    return None
+
+
+def fts_phrase(term):
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+def _icontains(columns, term):
+    condition = Q()
+    for column in columns:
+        condition |= Q(**{f'{column}__icontains': term})
+    return condition
+
+
+def search_filter(queryset, term):
+    """
+    Restrict a Customer or Product queryset to rows whose indexed columns
+    contain `term`, using the n-gram index where there is one
+    """
+    table, columns = SEARCH_INDEXES[queryset.model]
+    backend = search_backend(connections[queryset.db])
+    if backend == 'fts5' and len(term) >= MIN_TRIGRAM_LENGTH:
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [fts_phrase(term)])
+        )
+    # On PostgreSQL the pg_trgm GIN indexes on UPPER(column) serve icontains
+    return queryset.filter(_icontains(columns, term))
+
+
+def search(queryset, term):
+    """
+    Like search_filter() but ordered by relevance (best first), exposed as
+    `search_rank`: bm25 on SQLite, trigram similarity on PostgreSQL
+    """
+    table, columns = SEARCH_INDEXES[queryset.model]
+    backend = search_backend(connections[queryset.db])
+
+    if backend == 'fts5' and len(term) >= MIN_TRIGRAM_LENGTH:
+        pk = f'{queryset.model._meta.db_table}.{queryset.model._meta.pk.column}'
+        # FTS5 rank is bm25, where lower is better. The rank is looked up by
+        # rowid for the matching rows only.
+        return search_filter(queryset, term).annotate(
+            search_rank=RawSQL(
+                f'SELECT rank FROM {table} WHERE {table} MATCH %s AND rowid = {pk}',
+                [fts_phrase(term)],
+            )
+        ).order_by('search_rank', 'pk')
+
+    queryset = search_filter(queryset, term)
+    if backend == 'trigram':
+        from django.contrib.postgres.search import TrigramSimilarity
+        from django.db.models.functions import Greatest
+
+        similarities = [TrigramSimilarity(column, term) for column in columns]
+        similarity = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        return queryset.annotate(search_rank=similarity).order_by('-search_rank', 'pk')
+
+    return queryset.order_by('pk')
+
+
+def search_orders(queryset, term):
+    """
+    Orders whose customer or any product matches `term`, most recent first
+    """
+    customers = search_filter(Customer.objects.all(), term).values('pk')
+    products = search_filter(Product.objects.all(), term).values('pk')
+    product_match = Order.products.through.objects.filter(
+        order_id=OuterRef('pk'), product_id__in=products
+    )
+    return queryset.filter(
+        Q(customer_id__in=customers) | Exists(product_match)
+    ).order_by('-order_date', '-id')
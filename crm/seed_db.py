@@ -1,57 +1,60 @@
 import os
+import sys
+from pathlib import Path
+
 import django
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_backend_graphql_crm.settings')
+# Run from the project root rather than crm/, where celery.py would shadow the package
+sys.path[0] = str(Path(__file__).resolve().parents[1])
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_backend_graphql.settings')
 django.setup()
 
 from crm.models import Customer, Product, Order
+from crm.seeding import clear_data
+from crm.stats import rebuild_customer_stats
 
 def seed_database():
+    """
+    A small fixed data set for trying the API by hand.
+    For volume data use `python manage.py seed_crm`.
+    """
     # Clear existing data
-    Customer.objects.all().delete()
-    Product.objects.all().delete()
-    Order.objects.all().delete()
-    
+    clear_data(Order.objects.db)
+
     # Create customers
-    customers = [
+    Customer.objects.bulk_create([
         Customer(name="Alice Johnson", email="alice@example.com", phone="+1234567890"),
         Customer(name="Bob Smith", email="bob@example.com", phone="123-456-7890"),
         Customer(name="Carol Davis", email="carol@example.com"),
-    ]
-    for customer in customers:
-        customer.save()
-    
+    ])
+
     # Create products
-    products = [
+    Product.objects.bulk_create([
         Product(name="Laptop", price=999.99, stock=10),
         Product(name="Mouse", price=25.50, stock=50),
         Product(name="Keyboard", price=75.00, stock=30),
         Product(name="Monitor", price=299.99, stock=15),
-    ]
-    for product in products:
-        product.save()
-    
+    ])
+
     # Create orders
-    customer1 = Customer.objects.get(email="alice@example.com")
-    customer2 = Customer.objects.get(email="bob@example.com")
-    
-    product1 = Product.objects.get(name="Laptop")
-    product2 = Product.objects.get(name="Mouse")
-    product3 = Product.objects.get(name="Keyboard")
-    
-    # Order 1
-    order1 = Order(customer=customer1, total_amount=1075.49)
-    order1.save()
-    order1.products.set([product1, product2])
-    
-    # Order 2
-    order2 = Order(customer=customer2, total_amount=75.00)
-    order2.save()
-    order2.products.set([product3])
-    
+    customers = {c.email: c for c in Customer.objects.all()}
+    products = {p.name: p for p in Product.objects.all()}
+
+    order1, order2 = Order.objects.bulk_create([
+        Order(customer=customers["alice@example.com"], total_amount=1025.49),
+        Order(customer=customers["bob@example.com"], total_amount=75.00),
+    ])
+    Order.products.through.objects.bulk_create([
+        Order.products.through(order_id=order1.id, product_id=products["Laptop"].id),
+        Order.products.through(order_id=order1.id, product_id=products["Mouse"].id),
+        Order.products.through(order_id=order2.id, product_id=products["Keyboard"].id),
+    ])
+    # bulk_create skips the signals that keep the stats current
+    rebuild_customer_stats()
+
     print("Database seeded successfully!")
     print(f"Created {Customer.objects.count()} customers")
-    print(f"Created {Product.objects.count()} products") 
+    print(f"Created {Product.objects.count()} products")
     print(f"Created {Order.objects.count()} orders")
 
 if __name__ == "__main__":
@@ -0,0 +1,246 @@
+import multiprocessing
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Customer, CustomerStats, Order, Product, ProductSalesDay, Watermark
+from .response_cache import invalidate_models
+from .rollup import WATERMARK_NAME as SALES_ROLLUP_WATERMARK
+from .stats import invalidate_crm_statistics, rebuild_customer_stats
+
+FIRST_NAMES = ('Alice', 'Bob', 'Carol', 'Dave', 'Erin', 'Frank', 'Grace', 'Heidi', 'Ivan', 'Judy')
+LAST_NAMES = ('Johnson', 'Smith', 'Davis', 'Miller', 'Wilson', 'Moore', 'Taylor', 'Clark', 'Lewis')
+PRODUCT_NAMES = ('Laptop', 'Mouse', 'Keyboard', 'Monitor', 'Headset', 'Webcam', 'Dock', 'Cable')
+
+def chunk_random(seed, kind, start):
+    # Seeded per chunk, so the data doesn't depend on the number of workers
+    return random.Random(f'{seed}:{kind}:{start}')
+
+
+def random_date(rnd, now, days):
+    return now - timedelta(seconds=rnd.randint(0, days * 86400))
+
+
+def build_customers(rnd, ids, now, days):
+    return [
+        Customer(
+            id=i,
+            name=f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)} {i}",
+            email=f"customer{i}@example.com",
+            phone=f"+1{rnd.randint(2000000000, 9999999999)}" if rnd.random() < 0.8 else None,
+            created_at=random_date(rnd, now, days),
+        )
+        for i in ids
+    ]
+
+
+def build_products(rnd, ids, now, days):
+    return [
+        Product(
+            id=i,
+            name=f"{rnd.choice(PRODUCT_NAMES)} {i}",
+            price=Decimal(rnd.randint(100, 200000)) / 100,
+            # About 5% start below the default low-stock threshold
+            stock=rnd.randint(0, 9) if rnd.random() < 0.05 else rnd.randint(10, 500),
+            created_at=random_date(rnd, now, days),
+        )
+        for i in ids
+    ]
+
+
+_prices = {}
+_customer_ids = {}
+
+
+def product_prices(using, low, high):
+    # Read once per process; every order chunk draws from the same products
+    if (low, high) not in _prices:
+        _prices[(low, high)] = dict(
+            Product.objects.using(using).filter(id__range=(low, high)).values_list('id', 'price')
+        )
+    return _prices[(low, high)]
+
+
+def customer_ids(using, low, high):
+    # The IDs that exist: cleanup_inactive_customers leaves gaps
+    if (low, high) not in _customer_ids:
+        _customer_ids[(low, high)] = list(
+            Customer.objects.using(using).filter(id__range=(low, high)).values_list('id', flat=True)
+        )
+    return _customer_ids[(low, high)]
+
+
+def build_chunk(task):
+    """
+    Generate the rows for one ID range, without writing them
+    """
+    kind, start, stop, plan = task
+    rnd = chunk_random(plan['seed'], kind, start)
+    now, days = plan['now'], plan['days']
+    ids = range(start, stop)
+
+    if kind == 'customers':
+        return kind, build_customers(rnd, ids, now, days), []
+    if kind == 'products':
+        return kind, build_products(rnd, ids, now, days), []
+
+    prices = product_prices(plan['using'], *plan['product_ids'])
+    product_ids = list(prices)
+    customers = customer_ids(plan['using'], *plan['customer_ids'])
+    orders, links = [], []
+    for i in ids:
+        picked = rnd.sample(product_ids, rnd.randint(1, min(plan['max_products'], len(product_ids))))
+        order_date = random_date(rnd, now, days)
+        orders.append(Order(
+            id=i,
+            customer_id=rnd.choice(customers),
+            total_amount=sum(prices[p] for p in picked),
+            order_date=order_date,
+            # History, not new orders: settled for the incremental jobs
+            created_at=order_date,
+        ))
+        links.extend(Order.products.through(order_id=i, product_id=p) for p in picked)
+    return kind, orders, links
+
+
+def write_chunk(chunk, using):
+    kind, rows, links = chunk
+    with transaction.atomic(using=using):
+        type(rows[0]).objects.using(using).bulk_create(rows)
+        if links:
+            Order.products.through.objects.using(using).bulk_create(links)
+    return kind, len(rows)
+
+
+def insert_chunk(task):
+    """
+    Generate and insert one ID range; runs in a worker process
+    """
+    return write_chunk(build_chunk(task), task[3]['using'])
+
+
+def worker_init():
+    # Forked workers must open their own database connections
+    connections.close_all()
+
+
+def next_id(model, using):
+    return (model.objects.using(using).aggregate(last=Max('id'))['last'] or 0) + 1
+
+
+def clear_data(using):
+    """
+    Delete all CRM rows with the statements `manage.py flush` uses. No
+    per-row signals run, so the caches they maintain are invalidated here.
+    """
+    connection = connections[using]
+    tables = [
+        model._meta.db_table
+        for model in (Order.products.through, Order, CustomerStats, ProductSalesDay, Customer, Product)
+    ]
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sql_flush(no_style(), tables):
+                cursor.execute(sql)
+        # Order IDs start over, so the rollup must too
+        Watermark.objects.using(using).filter(name=SALES_ROLLUP_WATERMARK).delete()
+    invalidate_models(Customer, CustomerStats, Product, Order, ProductSalesDay)
+    invalidate_crm_statistics()
+
+
+def seed(customers=1000, products=100, orders=5000, max_products=5, days=730,
+         batch_size=5000, workers=1, seed=0, clear=False, log=None):
+    """
+    Insert synthetic customers, products and orders (with their M2M rows)
+    using bulk_create, split into ID ranges across `workers` processes.
+    New rows get explicit IDs after the current maximum, so workers never
+    need to read back what the others inserted.
+
+    Returns a dict of rows inserted per model.
+    """
+    using = router.db_for_write(Order)
+    connection = connections[using]
+    log = log or (lambda message: None)
+
+    if orders and not customers and not Customer.objects.using(using).exists():
+        raise Exception("Orders need at least one customer")
+    if orders and not products and not Product.objects.using(using).exists():
+        raise Exception("Orders need at least one product")
+
+    if clear:
+        clear_data(using)
+    _prices.clear()
+    _customer_ids.clear()
+
+    customer_start = next_id(Customer, using)
+    product_start = next_id(Product, using)
+    order_start = next_id(Order, using)
+    plan = {
+        'seed': seed,
+        'now': timezone.now(),
+        'days': days,
+        'using': using,
+        'max_products': max_products,
+        # Orders reference the new rows when there are any, else the existing ones
+        'customer_ids': (customer_start, customer_start + customers - 1) if customers
+        else (1, customer_start - 1),
+        'product_ids': (product_start, product_start + products - 1) if products
+        else (1, product_start - 1),
+    }
+
+    def tasks(kind, start, count):
+        return [
+            (kind, low, min(low + batch_size, start + count), plan)
+            for low in range(start, start + count, batch_size)
+        ]
+
+    # Orders read product prices, so they go in a second phase
+    phases = [
+        tasks('customers', customer_start, customers) + tasks('products', product_start, products),
+        tasks('orders', order_start, orders),
+    ]
+
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        workers = 1
+
+    inserted = {'customers': 0, 'products': 0, 'orders': 0}
+
+    def done(kind, count):
+        inserted[kind] += count
+        log(f"Inserted {inserted[kind]} {kind}")
+
+    if workers > 1:
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers, initializer=worker_init) as pool:
+            for phase in phases:
+                if connection.vendor == 'sqlite':
+                    # SQLite has a single writer: workers only generate the rows
+                    for chunk in pool.imap_unordered(build_chunk, phase):
+                        done(*write_chunk(chunk, using))
+                else:
+                    for kind, count in pool.imap_unordered(insert_chunk, phase):
+                        done(kind, count)
+    else:
+        for phase in phases:
+            for task in phase:
+                done(*insert_chunk(task))
+
+    # Explicit IDs leave PostgreSQL sequences behind
+    sequence_sql = connection.ops.sequence_reset_sql(no_style(), [Customer, Product, Order])
+    if sequence_sql:
+        with connection.cursor() as cursor:
+            for sql in sequence_sql:
+                cursor.execute(sql)
+
+    # bulk_create skips the signals that maintain stats and caches
+    if orders or clear:
+        rebuild_customer_stats(batch_size=batch_size)
+    invalidate_models(Customer, Product, Order, ProductSalesDay)
+    invalidate_crm_statistics()
+    return inserted
@@ -28,6 +28,18 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'crm.tasks.generate_crm_report',
         'schedule': crontab(day_of_week='mon', hour=6, minute=0),
     },
+    'generate-crm-breakdown-report': {
+        'task': 'crm.tasks.generate_crm_breakdown_report',
+        'schedule': crontab(day_of_week='mon', hour=6, minute=30),
+    },
+    'check-database-replicas': {
+        'task': 'crm.tasks.check_database_replicas',
+        'schedule': crontab(),
+    },
+    'update-sales-rollup': {
+        'task': 'crm.tasks.update_sales_rollup',
+        'schedule': crontab(minute='*/15'),
+    },
 }
 
 # Add to INSTALLED_APPS
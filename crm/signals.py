@@ -0,0 +1,74 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Customer, Order, Product
+from .response_cache import invalidate_models
+from .stats import forget_order, invalidate_crm_statistics, record_order
+
+
+STATS_FIELDS = ('customer_id', 'total_amount', 'order_date')
+
+
+@receiver(pre_save, sender=Order)
+def order_saving(sender, instance, raw=False, using=None, **kwargs):
+    """
+    Remember what an existing order counted for in CustomerStats
+    """
+    instance._stats_before = None
+    if not raw and not instance._state.adding and instance.pk is not None:
+        instance._stats_before = (
+            Order.objects.using(using).filter(pk=instance.pk).values_list(*STATS_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Order)
+def order_created(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep CustomerStats in step with new and edited orders. Edits through
+    QuerySet.update() send no signal; rebuild_customer_stats after those.
+    """
+    if raw:
+        return
+    after = tuple(getattr(instance, name) for name in STATS_FIELDS)
+    if not created:
+        before = getattr(instance, '_stats_before', None)
+        if before is None or before == after:
+            return
+        # Take the old figures off the old customer, then count the new ones
+        forget_order(*before)
+    record_order(*after)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    forget_order(instance.customer_id, instance.total_amount, instance.order_date)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def customer_or_order_written(sender, **kwargs):
+    """
+    Drop the cached crmStatistics result
+    """
+    invalidate_crm_statistics()
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def model_written(sender, **kwargs):
+    """
+    Invalidate cached GraphQL responses that read the written model
+    """
+    invalidate_models(sender)
+
+
+@receiver(m2m_changed, sender=Order.products.through)
+def order_products_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_models(Order)
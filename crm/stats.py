@@ -0,0 +1,222 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Customer, CustomerStats, Order
+from .response_cache import invalidate_models
+from .routers import replica_aliases, replica_cache_timeout
+
+STATISTICS_CACHE_KEY = 'crm:statistics'
+CENT = Decimal('0.01')
+
+
+def statistics_cache_key(using):
+    # Replicas may lag behind the primary, so each database caches its own figures
+    return f'{STATISTICS_CACHE_KEY}:{using}'
+
+
+def record_order(customer_id, total_amount, order_date, count=1):
+    """
+    Fold a newly created order (or `count` orders with their summed total
+    and latest date) into its customer's stats row
+    """
+    updated = CustomerStats.objects.filter(customer_id=customer_id).update(
+        order_count=F('order_count') + count,
+        lifetime_revenue=F('lifetime_revenue') + total_amount,
+        # Coalesce so the first order wins over NULL on every backend
+        last_order_date=Greatest(Coalesce('last_order_date', Value(order_date)), Value(order_date)),
+    )
+    invalidate_models(CustomerStats)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            CustomerStats.objects.create(
+                customer_id=customer_id,
+                order_count=count,
+                lifetime_revenue=total_amount,
+                last_order_date=order_date,
+            )
+    except IntegrityError:
+        # Another order for the same customer created the row first
+        record_order(customer_id, total_amount, order_date, count)
+
+
+def record_orders(totals, batch_size=500):
+    """
+    Fold many new orders into the stats rows at once, for writes that skip
+    the post_save signal (bulk_create). `totals` maps a customer ID to
+    (order count, revenue, latest order date).
+
+    Existing rows are updated by one parameterised UPDATE run with
+    executemany, missing rows are inserted with bulk_create.
+    """
+    using = router.db_for_write(CustomerStats)
+    connection = connections[using]
+    ops = connection.ops
+    quote = ops.quote_name
+    table = quote(CustomerStats._meta.db_table)
+    count_column, revenue_column, last_column, customer_column = (
+        quote(CustomerStats._meta.get_field(name).column)
+        for name in ('order_count', 'lifetime_revenue', 'last_order_date', 'customer')
+    )
+    sql = (
+        f"UPDATE {table} SET "
+        f"{count_column} = {count_column} + %s, "
+        f"{revenue_column} = {revenue_column} + %s, "
+        f"{last_column} = CASE WHEN {last_column} IS NULL OR {last_column} < %s "
+        f"THEN %s ELSE {last_column} END "
+        f"WHERE {customer_column} = %s"
+    )
+
+    customer_ids = list(totals)
+    for start in range(0, len(customer_ids), batch_size):
+        chunk = customer_ids[start:start + batch_size]
+        try:
+            with transaction.atomic(using=using):
+                existing = set(
+                    CustomerStats.objects.using(using).filter(customer_id__in=chunk)
+                    .values_list('customer_id', flat=True)
+                )
+                params = []
+                for pk in chunk:
+                    if pk in existing:
+                        count, revenue, latest = totals[pk]
+                        latest = ops.adapt_datetimefield_value(latest)
+                        params.append((count, ops.adapt_decimalfield_value(revenue), latest, latest, pk))
+                if params:
+                    with connection.cursor() as cursor:
+                        cursor.executemany(sql, params)
+                CustomerStats.objects.using(using).bulk_create([
+                    CustomerStats(
+                        customer_id=pk,
+                        order_count=totals[pk][0],
+                        lifetime_revenue=totals[pk][1],
+                        last_order_date=totals[pk][2],
+                    )
+                    for pk in chunk if pk not in existing
+                ])
+        except IntegrityError:
+            # Another order created one of the rows first
+            for pk in chunk:
+                count, revenue, latest = totals[pk]
+                record_order(pk, revenue, latest, count=count)
+    invalidate_models(CustomerStats)
+
+
+def forget_order(customer_id, total_amount, order_date):
+    """
+    Remove a deleted order from its customer's stats row
+    """
+    invalidate_models(CustomerStats)
+    stats = CustomerStats.objects.filter(customer_id=customer_id)
+    stats.update(
+        order_count=F('order_count') - 1,
+        lifetime_revenue=F('lifetime_revenue') - total_amount,
+    )
+    # Only the latest order moves last_order_date
+    stats.filter(last_order_date__lte=order_date).update(
+        last_order_date=Order.objects.filter(customer_id=customer_id)
+        .order_by()
+        .values('customer_id')
+        .annotate(latest=Max('order_date'))
+        .values('latest')
+    )
+
+
+def rebuild_customer_stats(batch_size=1000):
+    """
+    Recompute every stats row from the Order table.
+    Returns the number of rows written.
+    """
+    totals = (
+        Order.objects.order_by()
+        .values('customer_id')
+        .annotate(
+            order_count=Count('id'),
+            lifetime_revenue=Sum('total_amount'),
+            last_order_date=Max('order_date'),
+        )
+    )
+
+    written = 0
+    with transaction.atomic():
+        CustomerStats.objects.all().delete()
+        batch = []
+        for row in totals.iterator(chunk_size=batch_size):
+            batch.append(CustomerStats(**row))
+            if len(batch) >= batch_size:
+                CustomerStats.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            CustomerStats.objects.bulk_create(batch)
+            written += len(batch)
+    invalidate_models(CustomerStats)
+    return written
+
+
+def crm_statistics():
+    """
+    Customer/order counts and revenue computed with DB aggregates.
+    Cached for CRM_STATISTICS_CACHE_TTL seconds (default 60), less when
+    read from a replica, and dropped whenever a customer or order is written.
+    """
+    using = router.db_for_read(Order)
+    key = statistics_cache_key(using)
+    statistics = cache.get(key)
+    if statistics is None:
+        statistics = Order.objects.aggregate(
+            total_orders=Count('id'),
+            total_revenue=Coalesce(Sum('total_amount'), Value(Decimal('0.00'))),
+        )
+        statistics['total_customers'] = Customer.objects.count()
+        # SQLite sums decimals as floats
+        statistics['total_revenue'] = statistics['total_revenue'].quantize(CENT)
+        statistics['computed_at'] = timezone.now()
+        cache.set(
+            key, statistics,
+            replica_cache_timeout(using, getattr(settings, 'CRM_STATISTICS_CACHE_TTL', 60))
+        )
+    return statistics
+
+
+async def acrm_statistics():
+    """
+    crm_statistics() using the async ORM and cache APIs
+    """
+    using = router.db_for_read(Order)
+    key = statistics_cache_key(using)
+    statistics = await cache.aget(key)
+    if statistics is None:
+        statistics = await Order.objects.aaggregate(
+            total_orders=Count('id'),
+            total_revenue=Coalesce(Sum('total_amount'), Value(Decimal('0.00'))),
+        )
+        statistics['total_customers'] = await Customer.objects.acount()
+        # SQLite sums decimals as floats
+        statistics['total_revenue'] = statistics['total_revenue'].quantize(CENT)
+        statistics['computed_at'] = timezone.now()
+        await cache.aset(
+            key, statistics,
+            replica_cache_timeout(using, getattr(settings, 'CRM_STATISTICS_CACHE_TTL', 60))
+        )
+    return statistics
+
+
+def invalidate_crm_statistics():
+    """
+    Drop the cached figures once the current transaction commits, so a
+    read before the commit can't cache the pre-write numbers again
+    """
+    def drop():
+        cache.delete_many([
+            statistics_cache_key(using) for using in (router.db_for_write(Order), *replica_aliases())
+        ])
+
+    transaction.on_commit(drop)
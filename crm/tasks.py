@@ -1,7 +1,10 @@
-from celery import shared_task
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+from celery import chord, shared_task
 from datetime import datetime
+from django.conf import settings
+
+from crm import reports, rollup
+from crm.routers import check_replicas, read_from_replica
+from crm.jobs import get_job_client
 
 @shared_task
 def generate_crm_report():
@@ -9,35 +12,28 @@ def generate_crm_report():
     Celery task to generate weekly CRM report using GraphQL queries
     """
     try:
-        # Set up GraphQL transport and client
-        transport = RequestsHTTPTransport(
-            url="http://localhost:8000/graphql",
-            verify=True,
-            retries=3,
-        )
-        
-        client = Client(transport=transport, fetch_schema_from_transport=True)
+        # Runs in the worker process unless CRM_JOB_GRAPHQL_URL is set
+        client = get_job_client()
         
-        # GraphQL query to fetch CRM statistics
-        query = gql("""
+        # GraphQL query to fetch CRM statistics (aggregated and cached server-side)
+        query = """
             query GetCRMStatistics {
-                customers {
-                    totalCount
-                }
-                orders {
-                    totalCount
+                crmStatistics {
+                    totalCustomers
+                    totalOrders
                     totalRevenue
                 }
             }
-        """)
+        """
         
         # Execute the query
         result = client.execute(query)
         
         # Extract data from result
-        customers_count = result.get('customers', {}).get('totalCount', 0)
-        orders_count = result.get('orders', {}).get('totalCount', 0)
-        total_revenue = result.get('orders', {}).get('totalRevenue', 0)
+        statistics = result.get('crmStatistics') or {}
+        customers_count = statistics.get('totalCustomers', 0)
+        orders_count = statistics.get('totalOrders', 0)
+        total_revenue = statistics.get('totalRevenue', 0)
         
         # Format the report
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -55,61 +51,64 @@ def generate_crm_report():
             log_file.write(error_msg + '\n')
         return f"Error: {str(e)}"
 
+@shared_task
+def update_sales_rollup():
+    """
+    Celery task to fold new orders into the daily per-product sales rollup
+    """
+    written = rollup.update_sales_rollup()
+    return f"Sales rollup updated: {written} rows written"
 
-from celery import shared_task
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
-from datetime import datetime
-import requests
+@shared_task
+def generate_crm_breakdown_report(chunk_size=None, parallelism=None):
+    """
+    Celery task to build the per-customer and per-product report: a chord of
+    one crm_report_part per span of Order IDs, merged by merge_crm_report.
+    Returns the chord's result.
+    """
+    chunk_size = chunk_size or getattr(settings, 'CRM_REPORT_CHUNK_SIZE', 50000)
+    parallelism = parallelism or getattr(settings, 'CRM_REPORT_PARALLELISM', 4)
+    with read_from_replica():
+        spans = reports.report_spans(chunk_size, parallelism)
+    parts = [crm_report_part.s(low, high, chunk_size) for low, high in spans]
+    # A chord needs a result backend; with CELERY_TASK_ALWAYS_EAGER the
+    # parts and the merge run in this process
+    return chord(parts)(merge_crm_report.s()).id
 
 @shared_task
-def generate_crm_report():
+def crm_report_part(low, high, chunk_size):
     """
-    Celery task to generate weekly CRM report using GraphQL queries
+    Celery task to aggregate the orders with IDs in [low, high]
     """
-    try:
-        # Set up GraphQL transport and client
-        transport = RequestsHTTPTransport(
-            url="http://localhost:8000/graphql",
-            verify=True,
-            retries=3,
-        )
-        
-        client = Client(transport=transport, fetch_schema_from_transport=True)
-        
-        # GraphQL query to fetch CRM statistics
-        query = gql("""
-            query GetCRMStatistics {
-                customers {
-                    totalCount
-                }
-                orders {
-                    totalCount
-                    totalRevenue
-                }
-            }
-        """)
-        
-        # Execute the query
-        result = client.execute(query)
-        
-        # Extract data from result
-        customers_count = result.get('customers', {}).get('totalCount', 0)
-        orders_count = result.get('orders', {}).get('totalCount', 0)
-        total_revenue = result.get('orders', {}).get('totalRevenue', 0)
-        
-        # Format the report
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        report_message = f"{timestamp} - Report: {customers_count} customers, {orders_count} orders, {total_revenue} revenue"
-        
-        # Log the report
-        with open('/tmp/crm_report_log.txt', 'a') as log_file:
-            log_file.write(report_message + '\n')
-        
-        return f"Report generated: {customers_count} customers, {orders_count} orders, {total_revenue} revenue"
-        
-    except Exception as e:
-        error_msg = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Report generation failed: {str(e)}"
-        with open('/tmp/crm_report_log.txt', 'a') as log_file:
-            log_file.write(error_msg + '\n')
-        return f"Error: {str(e)}"
+    with read_from_replica():
+        return reports.partial_report(low, high, chunk_size)
+
+@shared_task
+def merge_crm_report(partials):
+    """
+    Celery task to merge the report parts, write the report as JSON and
+    log its totals
+    """
+    with read_from_replica():
+        report = reports.merge_reports(partials, top=getattr(settings, 'CRM_REPORT_TOP', 10))
+    reports.write_report(report, getattr(settings, 'CRM_REPORT_PATH', '/tmp/crm_breakdown_report.json'))
+
+    top_customer = report['top_customers'][0]['name'] if report['top_customers'] else None
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    report_message = (
+        f"{timestamp} - Breakdown report: {report['total_orders']} orders, "
+        f"{report['total_revenue']} revenue over {len(partials)} parts, top customer {top_customer}"
+    )
+    with open('/tmp/crm_report_log.txt', 'a') as log_file:
+        log_file.write(report_message + '\n')
+    return report_message
+
+@shared_task
+def check_database_replicas():
+    """
+    Celery task to take unreachable database replicas out of rotation and
+    put recovered ones back
+    """
+    health = check_replicas()
+    down = [alias for alias, healthy in health.items() if not healthy]
+    return f"Checked {len(health)} replicas, down: {', '.join(down) or 'none'}"
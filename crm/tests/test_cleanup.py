@@ -0,0 +1,59 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import router
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from crm.models import Customer, CustomerStats, Order, Product
+from crm.seeding import clear_data
+from crm.stats import crm_statistics
+
+
+@override_settings(CRM_DATABASE_REPLICAS=[])
+class CleanupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        product = Product.objects.create(name="Widget", price=Decimal('10.00'), stock=10)
+        self.active = Customer.objects.create(name="Active", email="active@example.com")
+        self.inactive = Customer.objects.create(name="Inactive", email="inactive@example.com")
+        for customer, days in ((self.active, 3), (self.inactive, 400), (self.inactive, 500)):
+            order = Order.objects.create(
+                customer=customer, total_amount=Decimal('10.00'),
+                order_date=timezone.now() - timedelta(days=days),
+            )
+            order.products.set([product])
+
+    def test_deletes_inactive_customers_and_their_orders(self):
+        self.assertEqual(crm_statistics()['total_orders'], 3)  # now cached
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('cleanup_inactive_customers', days=30, sleep=0, stdout=StringIO())
+
+        self.assertEqual(list(Customer.objects.all()), [self.active])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Order.products.through.objects.count(), 1)
+        self.assertEqual(
+            list(CustomerStats.objects.values_list('customer_id', 'order_count')), [(self.active.pk, 1)]
+        )
+        statistics = crm_statistics()
+        self.assertEqual((statistics['total_customers'], statistics['total_orders']), (1, 1))
+
+    def test_dry_run_deletes_nothing(self):
+        out = StringIO()
+        call_command('cleanup_inactive_customers', days=30, dry_run=True, stdout=out)
+        self.assertIn("1 inactive customers", out.getvalue())
+        self.assertEqual(Customer.objects.count(), 2)
+
+    def test_clear_data(self):
+        self.assertEqual(crm_statistics()['total_orders'], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            clear_data(router.db_for_write(Order))
+
+        for model in (Customer, Product, Order, Order.products.through, CustomerStats):
+            self.assertFalse(model.objects.exists(), model)
+        self.assertEqual(crm_statistics()['total_orders'], 0)
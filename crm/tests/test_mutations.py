@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.test import RequestFactory, TestCase
+
+from alx_backend_graphql.schema import schema
+from crm.models import Customer, Order, Product
+
+CREATE_ORDER = (
+    'mutation($customer: ID!, $products: [ID]!) { createOrder(input: '
+    '{customerId: $customer, productIds: $products}) { order { id totalAmount } } }'
+)
+
+
+class CreateOrderTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Anna", email="anna@example.com")
+        self.laptop = Product.objects.create(name="Laptop", price=Decimal('1060.69'), stock=5)
+        self.mouse = Product.objects.create(name="Mouse", price=Decimal('3.00'), stock=5)
+
+    def create_order(self, *products):
+        result = schema.execute(
+            CREATE_ORDER,
+            variable_values={'customer': self.customer.pk, 'products': [p.pk for p in products]},
+            context_value=RequestFactory().post('/graphql'),
+        )
+        self.assertIsNone(result.errors)
+        return result.data['createOrder']['order']
+
+    def test_total_amount_has_two_decimal_places(self):
+        self.assertEqual(self.create_order(self.mouse, self.mouse)['totalAmount'], '6.00')
+        self.assertEqual(self.create_order(self.laptop, self.mouse)['totalAmount'], '1063.69')
+
+    def test_reserves_stock(self):
+        order = self.create_order(self.laptop, self.mouse, self.mouse)
+        self.assertEqual(Order.objects.get().total_amount, Decimal('1066.69'))
+        self.assertEqual(Order.objects.get().products.count(), 2)
+        self.assertEqual(order['totalAmount'], '1066.69')
+        self.mouse.refresh_from_db()
+        self.assertEqual(self.mouse.stock, 3)
@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+from django.test import RequestFactory, TestCase
+
+from alx_backend_graphql.schema import schema
+from crm.models import Customer, Order, Product
+
+
+class OrderPageQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        products = [
+            Product.objects.create(name=f"Product {n}", price=Decimal('10.00'), stock=10)
+            for n in range(2)
+        ]
+        for n in range(7):
+            customer = Customer.objects.create(name=f"Customer {n}", email=f"customer{n}@example.com")
+            order = Order.objects.create(customer=customer, total_amount=Decimal('20.00'))
+            order.products.set(products)
+
+    def execute(self, query):
+        result = schema.execute(query, context_value=RequestFactory().post('/graphql'))
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def test_page_without_customer_is_one_query(self):
+        # The connection's COUNT and the page. The planner defers customer_id,
+        # so nothing may read it per row.
+        with self.assertNumQueries(2):
+            data = self.execute('{ allOrders(first: 7) { edges { node { id totalAmount } } } }')
+        self.assertEqual(len(data['allOrders']['edges']), 7)
+
+    def test_page_with_relations_batches_them(self):
+        # The COUNT, the page with the customer joined, one batch of products
+        with self.assertNumQueries(3):
+            data = self.execute(
+                '{ allOrders(first: 7) { edges { node { id customer { name } '
+                'products { edges { node { name } } } } } } }'
+            )
+        nodes = [edge['node'] for edge in data['allOrders']['edges']]
+        self.assertEqual(len({node['customer']['name'] for node in nodes}), 7)
+        self.assertTrue(all(len(node['products']['edges']) == 2 for node in nodes))
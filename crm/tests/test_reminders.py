@@ -0,0 +1,115 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from crm.models import Customer, Order, Watermark
+from crm.reminders import WATERMARK_NAME, dispatch_order_reminders
+
+
+class FailingConnection:
+    """
+    locmem connection that raises on the batch after `fail_after` sent ones
+    """
+
+    def __init__(self, fail_after):
+        self.connection = get_connection('django.core.mail.backends.locmem.EmailBackend')
+        self.fail_after = fail_after
+        self.batches = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def send_messages(self, messages):
+        if self.batches == self.fail_after:
+            raise ConnectionError("SMTP server went away")
+        self.batches += 1
+        return self.connection.send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', CRM_WATERMARK_SETTLE_SECONDS=0
+)
+class OrderReminderTests(TestCase):
+    def setUp(self):
+        self.customers = [
+            Customer.objects.create(name=f"Customer {n}", email=f"customer{n}@example.com")
+            for n in range(5)
+        ]
+
+    def order(self, customer, days_ago=1, **kwargs):
+        return Order.objects.create(
+            **kwargs,
+            customer=customer,
+            total_amount=Decimal('10.00'),
+            order_date=timezone.now() - timedelta(days=days_ago),
+        )
+
+    def test_one_message_per_customer_in_batches(self):
+        for customer in self.customers:
+            self.order(customer)
+            self.order(customer)
+        self.order(self.customers[0], days_ago=30)
+
+        orders, emails = dispatch_order_reminders(days=7, batch_size=2)
+
+        self.assertEqual((orders, emails), (10, 5))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         sorted(customer.email for customer in self.customers))
+        self.assertEqual(mail.outbox[0].body.count("Order #"), 2)
+
+    def test_rerun_skips_handled_orders(self):
+        for customer in self.customers:
+            self.order(customer)
+        dispatch_order_reminders(batch_size=2)
+        mail.outbox.clear()
+
+        self.assertEqual(dispatch_order_reminders(batch_size=2), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+        new_order = self.order(self.customers[3])
+        self.assertEqual(dispatch_order_reminders(batch_size=2), (1, 1))
+        self.assertEqual(mail.outbox[0].to, [self.customers[3].email])
+        self.assertIn(f"Order #{new_order.id}", mail.outbox[0].body)
+
+    def test_failure_keeps_sent_batches(self):
+        for customer in self.customers:
+            self.order(customer)
+
+        with self.assertRaises(ConnectionError):
+            dispatch_order_reminders(batch_size=2, connection=FailingConnection(fail_after=1))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            Watermark.objects.get(name=WATERMARK_NAME).value,
+            Order.objects.order_by('id')[1].id,
+        )
+
+        # The rerun sends only the customers the failed run didn't reach
+        dispatch_order_reminders(batch_size=2)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(len({message.to[0] for message in mail.outbox}), 5)
+
+    @override_settings(CRM_WATERMARK_SETTLE_SECONDS=60)
+    def test_lower_id_committed_late_is_not_skipped(self):
+        settled = self.order(self.customers[0])
+        Order.objects.filter(pk=settled.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        # Just inserted: a lower ID may still be in an open transaction
+        recent = self.order(self.customers[1], id=settled.id + 10)
+
+        self.assertEqual(dispatch_order_reminders(), (1, 1))
+        self.assertEqual(Watermark.objects.get(name=WATERMARK_NAME).value, settled.id)
+
+        # The lower ID commits after the run saw the higher one
+        late = self.order(self.customers[2], id=settled.id + 5)
+        Order.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(dispatch_order_reminders(), (2, 2))
+        bodies = "".join(message.body for message in mail.outbox[1:])
+        self.assertIn(f"Order #{late.id} ", bodies)
+        self.assertIn(f"Order #{recent.id} ", bodies)
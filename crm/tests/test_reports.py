@@ -0,0 +1,130 @@
+import json
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+from celery import Celery, current_app
+from celery.contrib.testing.app import setup_default_app
+from django.db.models import Count, Sum
+from django.test import TestCase, override_settings
+
+from crm import tasks
+from crm.models import Customer, Order, Product
+from crm.reports import report_spans
+
+
+class ReportTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The chord and its parts run in this process
+        cls.celery_app = Celery('crm-tests', set_as_current=False)
+        cls.celery_app.conf.update(
+            task_always_eager=True,
+            task_eager_propagates=True,
+            result_backend='cache+memory://',
+        )
+        # Put back the previous current and default apps after the class
+        cls.enterClassContext(setup_default_app(cls.celery_app))
+        cls.celery_app.set_current()
+        cls.celery_app.set_default()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.report_path = Path(directory.name) / 'report.json'
+        settings_override = override_settings(
+            CRM_REPORT_PATH=str(self.report_path), CRM_DATABASE_REPLICAS=[]
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_orders(self, count):
+        customers = [
+            Customer.objects.create(name=f"Customer {n}", email=f"customer{n}@example.com")
+            for n in range(4)
+        ]
+        products = [
+            Product.objects.create(name=f"Product {n}", price=Decimal(n + 1) * 10, stock=100)
+            for n in range(3)
+        ]
+        for n in range(count):
+            picked = products[:n % 3 + 1]
+            order = Order.objects.create(
+                customer=customers[n % 4],
+                total_amount=sum(product.price for product in picked),
+            )
+            order.products.set(picked)
+
+    def run_report(self, **kwargs):
+        tasks.generate_crm_breakdown_report.delay(**kwargs)
+        return json.loads(self.report_path.read_text())
+
+
+class ReportSpanTests(ReportTestCase):
+    def test_spans_that_do_not_divide_evenly(self):
+        self.create_orders(11)
+        ids = list(Order.objects.order_by('id').values_list('id', flat=True))
+
+        spans = report_spans(chunk_size=2, parallelism=4)
+
+        self.assertLessEqual(len(spans), 4)
+        self.assertEqual(spans[0][0], ids[0])
+        self.assertEqual(spans[-1][1], ids[-1])
+        for (_, high), (low, _) in zip(spans, spans[1:]):
+            self.assertEqual(low, high + 1)
+        # Whole chunks, except at the end of the ID range
+        for low, high in spans[:-1]:
+            self.assertEqual((high - low + 1) % 2, 0)
+
+    def test_no_orders_no_spans(self):
+        self.assertEqual(report_spans(chunk_size=10, parallelism=4), [])
+
+
+class BreakdownReportTests(ReportTestCase):
+    def test_merged_totals_match_order_aggregates(self):
+        self.create_orders(23)
+
+        report = self.run_report(chunk_size=3, parallelism=4)
+
+        totals = Order.objects.aggregate(orders=Count('id'), revenue=Sum('total_amount'))
+        self.assertEqual(report['total_orders'], totals['orders'])
+        self.assertEqual(Decimal(report['total_revenue']), totals['revenue'])
+
+        per_customer = {
+            row['customer_id']: (row['orders'], row['revenue'])
+            for row in Order.objects.values('customer_id')
+            .annotate(orders=Count('id'), revenue=Sum('total_amount'))
+        }
+        self.assertEqual(
+            {row['id']: (row['orders'], Decimal(row['revenue'])) for row in report['customers']},
+            per_customer,
+        )
+
+        per_product = dict(
+            Order.products.through.objects.values('product_id')
+            .annotate(units=Count('pk')).values_list('product_id', 'units')
+        )
+        self.assertEqual({row['id']: row['units'] for row in report['products']}, per_product)
+        # Ranked by revenue at list price, not by units sold
+        best = max(Product.objects.all(), key=lambda product: per_product[product.id] * product.price)
+        self.assertEqual(report['top_products'][0]['name'], best.name)
+
+    def test_same_totals_for_any_split(self):
+        self.create_orders(17)
+        single = self.run_report(chunk_size=1000, parallelism=1)
+        split = self.run_report(chunk_size=1, parallelism=5)
+        for key in ('total_orders', 'total_revenue', 'customers', 'products'):
+            self.assertEqual(single[key], split[key])
+
+    def test_empty_table(self):
+        report = self.run_report(chunk_size=10, parallelism=4)
+        self.assertEqual(report['total_orders'], 0)
+        self.assertEqual(report['total_revenue'], '0.00')
+        self.assertEqual(report['customers'], [])
+
+
+class CeleryAppRestoredTests(TestCase):
+    def test_app_restored(self):
+        # Runs after BreakdownReportTests: unittest loads a module's classes in name order
+        self.assertNotEqual(current_app.main, 'crm-tests')
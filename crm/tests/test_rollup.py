@@ -0,0 +1,87 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from crm.models import Customer, Order, Product, ProductSalesDay, Watermark
+from crm.rollup import WATERMARK_NAME, rebuild_sales_rollup, sales_timeseries, update_sales_rollup
+
+
+@override_settings(CRM_WATERMARK_SETTLE_SECONDS=0)
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Anna", email="anna@example.com")
+        self.laptop = Product.objects.create(name="Laptop", price=Decimal('1000.00'), stock=10)
+        self.mouse = Product.objects.create(name="Mouse", price=Decimal('20.00'), stock=10)
+
+    def order(self, day, *products, **kwargs):
+        order = Order.objects.create(
+            **kwargs,
+            customer=self.customer,
+            total_amount=sum(product.price for product in products),
+            order_date=datetime(day.year, day.month, day.day, 12, tzinfo=dt_timezone.utc),
+        )
+        order.products.set(products)
+        return order
+
+    def rollup(self):
+        return {
+            (row.product_id, row.day): (row.units, row.revenue, row.order_count)
+            for row in ProductSalesDay.objects.all()
+        }
+
+    def test_incremental_runs_match_a_rebuild(self):
+        self.order(date(2026, 1, 5), self.laptop, self.mouse)
+        self.order(date(2026, 1, 5), self.mouse)
+        update_sales_rollup(batch_size=1)
+        self.order(date(2026, 1, 6), self.laptop)
+        self.order(date(2026, 1, 5), self.mouse)
+        update_sales_rollup()
+        incremental = self.rollup()
+
+        rebuild_sales_rollup()
+        self.assertEqual(incremental, self.rollup())
+        self.assertEqual(incremental[(self.mouse.pk, date(2026, 1, 5))], (3, Decimal('60.00'), 3))
+
+    @override_settings(CRM_WATERMARK_SETTLE_SECONDS=60)
+    def test_lower_id_committed_late_is_not_skipped(self):
+        settled = self.order(date(2026, 1, 5), self.mouse)
+        Order.objects.filter(pk=settled.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        # Just inserted: a lower ID may still be in an open transaction
+        self.order(date(2026, 1, 5), self.mouse, id=settled.id + 10)
+
+        update_sales_rollup()
+        self.assertEqual(Watermark.objects.get(name=WATERMARK_NAME).value, settled.id)
+        self.assertEqual(self.rollup()[(self.mouse.pk, date(2026, 1, 5))][0], 1)
+
+        # The lower ID commits after the run saw the higher one
+        self.order(date(2026, 1, 5), self.mouse, id=settled.id + 5)
+        Order.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+
+        update_sales_rollup()
+        self.assertEqual(self.rollup()[(self.mouse.pk, date(2026, 1, 5))][0], 3)
+
+    def test_timeseries_fills_empty_buckets(self):
+        self.order(date(2026, 1, 5), self.laptop, self.mouse)
+        self.order(date(2026, 1, 20), self.mouse)
+        rebuild_sales_rollup()
+
+        points = sales_timeseries(date(2026, 1, 1), date(2026, 1, 31), bucket='week')
+        self.assertEqual(
+            [(point['start'], point['units'], point['revenue']) for point in points],
+            [
+                (date(2025, 12, 29), 0, Decimal('0.00')),
+                (date(2026, 1, 5), 2, Decimal('1020.00')),
+                (date(2026, 1, 12), 0, Decimal('0.00')),
+                (date(2026, 1, 19), 1, Decimal('20.00')),
+                (date(2026, 1, 26), 0, Decimal('0.00')),
+            ],
+        )
+
+    @override_settings(CRM_TIMESERIES_MAX_BUCKETS=31)
+    def test_timeseries_range_is_bounded(self):
+        self.assertEqual(len(sales_timeseries(date(2026, 1, 1), date(2026, 1, 31))), 31)
+        with self.assertRaisesMessage(Exception, "more than 31 day buckets"):
+            sales_timeseries(date(2026, 1, 1), date(2026, 2, 1))
+        self.assertEqual(len(sales_timeseries(date(2024, 1, 1), date(2026, 7, 31), bucket='month')), 31)
@@ -0,0 +1,87 @@
+import json
+import time
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from crm.models import Customer
+from crm.response_cache import get_cache
+from crm.routers import current_replica, mark_replica_down, read_your_writes_cookie
+
+CUSTOMERS = '{ customers { name } }'
+CREATE_CUSTOMER = (
+    'mutation { createCustomer(input: {name: "New Customer", email: "new@example.com"}) '
+    '{ customer { name } } }'
+)
+
+
+@override_settings(ROOT_URLCONF='crm.tests.urls', CRM_DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    # Two SQLite files: a row's name tells which database a read went to
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        get_cache().clear()
+        Customer.objects.using('default').create(name="Primary", email="primary@example.com")
+        Customer.objects.using('replica').create(name="Replica", email="replica@example.com")
+
+    def post(self, body, path='/graphql'):
+        response = self.client.post(path, json.dumps(body), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def customer_names(self, result):
+        return [customer['name'] for customer in result['data']['customers']]
+
+    def test_queries_read_from_the_replica(self):
+        response = self.post({'query': CUSTOMERS})
+        self.assertEqual(self.customer_names(response.json()), ["Replica"])
+        self.assertNotIn(read_your_writes_cookie(), response.cookies)
+
+    def test_mutations_write_to_the_primary(self):
+        response = self.post({'query': CREATE_CUSTOMER})
+        self.assertEqual(response.json()['data']['createCustomer']['customer']['name'], "New Customer")
+        self.assertTrue(Customer.objects.using('default').filter(name="New Customer").exists())
+        self.assertFalse(Customer.objects.using('replica').filter(name="New Customer").exists())
+
+    def test_mutation_pins_reads_to_the_primary(self):
+        response = self.post({'query': CREATE_CUSTOMER})
+        self.assertIn(read_your_writes_cookie(), response.cookies)
+
+        # The test client sends the cookie back
+        response = self.post({'query': CUSTOMERS})
+        self.assertEqual(self.customer_names(response.json()), ["Primary", "New Customer"])
+
+    def test_pin_expires(self):
+        self.client.cookies[read_your_writes_cookie()] = f'{time.time() - 1:.3f}'
+        response = self.post({'query': CUSTOMERS})
+        self.assertEqual(self.customer_names(response.json()), ["Replica"])
+
+    def test_replica_marked_down_falls_back_to_the_primary(self):
+        mark_replica_down('replica')
+        response = self.post({'query': CUSTOMERS})
+        self.assertEqual(self.customer_names(response.json()), ["Primary"])
+
+    @override_settings(CRM_REPLICA_CACHE_TTL=0)
+    def test_replica_responses_cached_briefly(self):
+        # A zero timeout stores nothing: the replica is read every time
+        self.post({'query': CUSTOMERS})
+        Customer.objects.using('replica').update(name="Caught Up")
+        response = self.post({'query': CUSTOMERS})
+        self.assertEqual(self.customer_names(response.json()), ["Caught Up"])
+
+    async def test_async_batch_keeps_a_replica_per_operation(self):
+        response = await self.async_client.post(
+            '/graphql/async',
+            json.dumps([{'query': CUSTOMERS}, {'query': CREATE_CUSTOMER}, {'query': CUSTOMERS}]),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        before, created, after = response.json()
+        self.assertEqual(self.customer_names(before), ["Replica"])
+        self.assertEqual(created['data']['createCustomer']['customer']['name'], "New Customer")
+        # Queries after the mutation read the primary
+        self.assertEqual(self.customer_names(after), ["Primary", "New Customer"])
+        self.assertIn(read_your_writes_cookie(), response.cookies)
+        self.assertIsNone(current_replica.get())
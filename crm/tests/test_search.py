@@ -0,0 +1,119 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+
+from crm.filters import CustomerFilter, OrderFilter, ProductFilter
+from crm.models import Customer, Order, Product
+from crm.search import search, search_backend
+
+
+class SearchIndexTests(TestCase):
+    def test_triggers_survive_migrations(self):
+        if search_backend(connection) != 'fts5':
+            self.skipTest("No FTS5 search index on this database")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'crm_%_search_%'"
+            )
+            triggers = {name for name, in cursor.fetchall()}
+        self.assertEqual(triggers, {
+            f'{index}_{suffix}'
+            for index in ('crm_customer_search', 'crm_product_search')
+            for suffix in ('ai', 'ad', 'au')
+        })
+
+    def test_search_after_migrating(self):
+        customer = Customer.objects.create(name="Customer 12", email="c12@example.com")
+        product = Product.objects.create(name="Laptop stand", price=25, stock=3)
+        self.assertEqual(list(search(Customer.objects.all(), 'c12')), [customer])
+        self.assertEqual(list(search(Product.objects.all(), 'stand')), [product])
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # The weaker matches are created first, so ID order can't pass for rank order
+        cls.bob = Customer.objects.create(name="Bob Jones", email="bsmith@example.org")
+        cls.anna = Customer.objects.create(name="Anna Smith", email="anna.smith@example.com")
+        cls.carol = Customer.objects.create(name="Carol White", email="carol@example.net")
+        cls.sleeve = Product.objects.create(name="Laptop sleeve", price=Decimal('19.00'), stock=50)
+        cls.laptop = Product.objects.create(name="Laptop", price=Decimal('999.00'), stock=5)
+        cls.mouse = Product.objects.create(name="Mouse", price=Decimal('15.00'), stock=80)
+
+    def names(self, queryset):
+        return [obj.name for obj in queryset]
+
+    def test_matches_name_and_email(self):
+        self.assertEqual(self.names(search(Customer.objects.all(), 'white')), ["Carol White"])
+        self.assertEqual(self.names(search(Customer.objects.all(), 'example.org')), ["Bob Jones"])
+        self.assertEqual(self.names(search(Customer.objects.all(), 'nobody')), [])
+
+    def test_case_insensitive_substring(self):
+        self.assertEqual(self.names(search(Product.objects.all(), 'APTO')), ["Laptop", "Laptop sleeve"])
+
+    def test_ranks_best_match_first(self):
+        # "smith" is in both of Anna's columns and only in Bob's email
+        self.assertEqual(self.names(search(Customer.objects.all(), 'smith')), ["Anna Smith", "Bob Jones"])
+        # The shorter name is the closer match
+        self.assertEqual(self.names(search(Product.objects.all(), 'laptop')), ["Laptop", "Laptop sleeve"])
+
+    def test_short_terms(self):
+        # Below one trigram the index can't help; the columns are scanned
+        self.assertEqual(self.names(search(Product.objects.all(), 'op')), ["Laptop sleeve", "Laptop"])
+
+    def test_search_combines_with_other_filters(self):
+        queryset = Customer.objects.filter(email__endswith='.com')
+        self.assertEqual(self.names(search(queryset, 'smith')), ["Anna Smith"])
+
+    def test_index_follows_save(self):
+        self.carol.name = "Carol Black"
+        self.carol.save()
+        self.assertEqual(self.names(search(Customer.objects.all(), 'white')), [])
+        self.assertEqual(self.names(search(Customer.objects.all(), 'black')), ["Carol Black"])
+
+    def test_index_follows_queryset_update(self):
+        Product.objects.filter(pk=self.mouse.pk).update(name="Trackball")
+        self.assertEqual(self.names(search(Product.objects.all(), 'mouse')), [])
+        self.assertEqual(self.names(search(Product.objects.all(), 'ball')), ["Trackball"])
+
+    def test_index_follows_bulk_create(self):
+        Customer.objects.bulk_create([
+            Customer(name=f"Dave Smithers {n}", email=f"dave{n}@example.com") for n in range(2)
+        ])
+        self.assertEqual(
+            self.names(search(Customer.objects.all(), 'smithers')), ["Dave Smithers 0", "Dave Smithers 1"]
+        )
+
+    def test_index_follows_delete(self):
+        self.anna.delete()
+        self.assertEqual(self.names(search(Customer.objects.all(), 'smith')), ["Bob Jones"])
+        Product.objects.filter(name__startswith="Laptop").delete()
+        self.assertEqual(self.names(search(Product.objects.all(), 'laptop')), [])
+
+
+class SearchFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.anna = Customer.objects.create(name="Anna Smith", email="anna@example.com")
+        cls.bob = Customer.objects.create(name="Bob Jones", email="bob@example.com")
+        cls.laptop = Product.objects.create(name="Laptop", price=Decimal('999.00'), stock=5)
+        cls.mouse = Product.objects.create(name="Mouse", price=Decimal('15.00'), stock=80)
+        cls.anna_order = Order.objects.create(customer=cls.anna, total_amount=Decimal('15.00'))
+        cls.anna_order.products.set([cls.mouse])
+        cls.bob_order = Order.objects.create(customer=cls.bob, total_amount=Decimal('999.00'))
+        cls.bob_order.products.set([cls.laptop])
+
+    def test_customer_filter(self):
+        filterset = CustomerFilter({'search': 'smith'}, queryset=Customer.objects.all())
+        self.assertEqual(list(filterset.qs), [self.anna])
+
+    def test_product_filter(self):
+        filterset = ProductFilter({'search': 'lapt'}, queryset=Product.objects.all())
+        self.assertEqual(list(filterset.qs), [self.laptop])
+
+    def test_order_filter_matches_customer_or_product(self):
+        by_customer = OrderFilter({'search': 'jones'}, queryset=Order.objects.all())
+        self.assertEqual(list(by_customer.qs), [self.bob_order])
+        by_product = OrderFilter({'search': 'mouse'}, queryset=Order.objects.all())
+        self.assertEqual(list(by_product.qs), [self.anna_order])
@@ -0,0 +1,29 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from alx_backend_graphql.schema import schema
+from crm.models import Customer, Order
+
+
+@override_settings(CRM_DATABASE_REPLICAS=[])
+class CRMStatisticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def statistics(self):
+        result = schema.execute('{ crmStatistics { totalCustomers totalOrders totalRevenue } }')
+        self.assertIsNone(result.errors)
+        return result.data['crmStatistics']
+
+    def test_revenue_has_two_decimal_places(self):
+        customer = Customer.objects.create(name="Anna", email="anna@example.com")
+        for amount in ('1060.69', '389.35', '0.10'):
+            Order.objects.create(customer=customer, total_amount=Decimal(amount))
+        self.assertEqual(
+            self.statistics(), {'totalCustomers': 1, 'totalOrders': 3, 'totalRevenue': '1450.14'}
+        )
+
+    def test_no_orders(self):
+        self.assertEqual(self.statistics(), {'totalCustomers': 0, 'totalOrders': 0, 'totalRevenue': '0.00'})
@@ -0,0 +1,10 @@
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
+from alx_backend_graphql.schema import schema
+from crm.views import AsyncCRMGraphQLView, CRMGraphQLView
+
+urlpatterns = [
+    path('graphql', csrf_exempt(CRMGraphQLView.as_view(schema=schema))),
+    path('graphql/async', csrf_exempt(AsyncCRMGraphQLView.as_view(schema=schema))),
+]
@@ -0,0 +1,238 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from inspect import isawaitable
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .cost import is_connection, is_edge
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """
+    A Prometheus histogram with one label, kept in process memory.
+    Each worker process exposes its own numbers.
+    """
+
+    def __init__(self, name, documentation, label, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for label_value, (counts, total) in sorted(series.items()):
+            label = f'{self.label}="{escape_label(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label}}} {total}')
+            lines.append(f'{self.name}_count{{{label}}} {cumulative}')
+        return lines
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+operation_duration = Histogram(
+    'crm_graphql_operation_duration_seconds', 'GraphQL operation wall time.',
+    'operation', DURATION_BUCKETS,
+)
+operation_queries = Histogram(
+    'crm_graphql_operation_sql_queries', 'SQL queries run by a sampled GraphQL operation.',
+    'operation', QUERY_BUCKETS,
+)
+operation_sql_duration = Histogram(
+    'crm_graphql_operation_sql_duration_seconds', 'SQL time of a sampled GraphQL operation.',
+    'operation', DURATION_BUCKETS,
+)
+resolver_duration = Histogram(
+    'crm_graphql_resolver_duration_seconds',
+    'Wall time of sampled GraphQL resolvers, excluding their child fields.',
+    'field', DURATION_BUCKETS,
+)
+METRICS = (operation_duration, operation_queries, operation_sql_duration, resolver_duration)
+
+_operation_names = set()
+_operation_names_lock = threading.Lock()
+
+
+def operation_label(operation_name):
+    """
+    Clients choose operation names, so only the first
+    CRM_METRICS_MAX_OPERATIONS (default 200) get their own series
+    """
+    name = operation_name or 'anonymous'
+    with _operation_names_lock:
+        if name in _operation_names:
+            return name
+        if len(_operation_names) < getattr(settings, 'CRM_METRICS_MAX_OPERATIONS', 200):
+            _operation_names.add(name)
+            return name
+    return 'other'
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class Trace:
+    """
+    Timings of one sampled operation: SQL count/time from a database
+    execute wrapper and self time of every resolver that returns an object
+    """
+
+    def __init__(self):
+        self.duration = None
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.resolvers = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+
+    def as_extension(self):
+        return {
+            'durationMs': round(self.duration * 1000, 3),
+            'sql': {'count': self.sql_count, 'durationMs': round(self.sql_time * 1000, 3)},
+            'resolvers': [
+                {
+                    'path': path,
+                    'field': field,
+                    'durationMs': round(elapsed * 1000, 3),
+                    'sqlCount': sql_count,
+                }
+                for path, field, elapsed, sql_count in self.resolvers
+            ],
+        }
+
+
+# The operation being traced. A context variable rather than a per-request
+# execute_wrapper or request attribute, because under the async view the
+# queries run in Django's sync thread, which asgiref runs with a copy of this
+# context, and the operations of a batch may run concurrently.
+current_trace = ContextVar('crm_trace', default=None)
+
+
+def trace_sql(execute, sql, params, many, context):
+    trace = current_trace.get()
+    if trace is None:
+        return execute(sql, params, many, context)
+    return trace(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_sql_tracing(sender, connection, **kwargs):
+    if trace_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(trace_sql)
+
+
+def should_sample():
+    rate = getattr(settings, 'CRM_TRACING_SAMPLE_RATE', 0.1)
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+@contextmanager
+def trace_operation(operation_name):
+    """
+    Time one GraphQL operation. Every operation is counted in the duration
+    histogram; a CRM_TRACING_SAMPLE_RATE share of them is also traced
+    (SQL and per-resolver timings). Yields the Trace, or None when the
+    operation is not sampled.
+    """
+    label = operation_label(operation_name)
+    trace = Trace() if should_sample() else None
+    token = current_trace.set(trace)
+    started = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
+        duration = time.perf_counter() - started
+        operation_duration.observe(label, duration)
+        if trace is not None:
+            trace.duration = duration
+            operation_queries.observe(label, trace.sql_count)
+            operation_sql_duration.observe(label, trace.sql_time)
+            for path, field, elapsed, sql_count in trace.resolvers:
+                resolver_duration.observe(field, elapsed)
+
+
+class TracingMiddleware:
+    """
+    Graphene middleware recording resolver timings into the current
+    operation's Trace. Leaf fields below the root and the edges/node wrappers of
+    connections are skipped, as their resolvers are attribute reads.
+    """
+
+    def resolve(self, next, root, info, **args):
+        trace = current_trace.get()
+        if trace is None or (info.path.prev is not None and (
+            not info.field_nodes[0].selection_set
+            or is_connection(info.parent_type) or is_edge(info.parent_type)
+        )):
+            return next(root, info, **args)
+
+        sql_count = trace.sql_count
+        started = time.perf_counter()
+        try:
+            result = next(root, info, **args)
+        except Exception:
+            self.finish(trace, info, started, sql_count)
+            raise
+        if isawaitable(result):
+            return self.finish_async(trace, info, result, started, sql_count)
+        self.finish(trace, info, started, sql_count)
+        return result
+
+    async def finish_async(self, trace, info, result, started, sql_count):
+        try:
+            return await result
+        finally:
+            self.finish(trace, info, started, sql_count)
+
+    def finish(self, trace, info, started, sql_count):
+        # Under the async view concurrent root fields share the SQL counter
+        trace.resolvers.append((
+            info.path.as_list(),
+            f'{info.parent_type.name}.{info.field_name}',
+            time.perf_counter() - started,
+            trace.sql_count - sql_count,
+        ))
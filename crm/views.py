@@ -0,0 +1,485 @@
+import asyncio
+import json
+from contextlib import nullcontext
+from inspect import isawaitable
+from typing import NamedTuple
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.contrib.auth.decorators import permission_required
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBadRequest
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import ensure_csrf_cookie
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView, HttpError
+from graphql import ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast
+
+from .cost import QueryCostError, check_cost
+from .documents import document_cache, resolve_persisted_query
+from .exports import EXPORT_FORMATS, export_orders
+from .loaders import reset_loaders
+from .response_cache import (
+    document_models, get_response, model_tag, response_key, set_response, tag_versions
+)
+from .routers import (
+    choose_replica, current_replica, pin_to_primary, pinned_to_primary, read_from_replica
+)
+from .tracing import render_metrics, trace_operation
+
+
+class PreparedOperation(NamedTuple):
+    schema: object
+    document: object
+    operation_ast: object
+    extensions: dict
+
+
+class CRMGraphQLView(GraphQLView):
+    """
+    GraphQL endpoint that accepts persisted query hashes, reuses parsed and
+    validated documents across requests, rejects operations over the cost
+    budget before they run and serves repeated read queries from the
+    model-tagged response cache.
+
+    A JSON array POSTed instead of a single operation is a batch: the
+    operations run in order within the one request, sharing its DataLoader
+    cache, and the response is the array of their results. Batches are
+    limited to CRM_GRAPHQL_BATCH_MAX_SIZE operations and
+    CRM_GRAPHQL_BATCH_COST_LIMIT total query cost.
+
+    Queries read from a database replica (see crm.routers) unless the client
+    wrote in this request or within CRM_READ_YOUR_WRITES_SECONDS before it.
+    Responses are cached per database, those read from a replica only briefly.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if getattr(request, 'crm_wrote', False):
+            pin_to_primary(response)
+        return response
+
+    def parse_body(self, request):
+        # The view is instantiated per request, so `batch` can follow the body
+        if self.get_content_type(request) == "application/json" and request.body.lstrip()[:1] == b"[":
+            self.batch = True
+        data = super().parse_body(request)
+        if self.batch:
+            max_size = getattr(settings, 'CRM_GRAPHQL_BATCH_MAX_SIZE', 10)
+            if len(data) > max_size:
+                raise HttpError(HttpResponseBadRequest(
+                    f"Batch of {len(data)} operations exceeds the maximum of {max_size}."
+                ))
+            # Running total for crm.cost.charge_batch
+            request.crm_batch_cost = 0
+        return data
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        return self.build_response(request, execution_result, id, show_graphiql)
+
+    def build_response(self, request, execution_result, id, show_graphiql=False):
+        """
+        Same as the second half of GraphQLView.get_response, plus the
+        result's `extensions` (query cost and trace)
+        """
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        status_code = 200
+        if execution_result:
+            response = {}
+
+            if execution_result.errors:
+                set_rollback()
+                response["errors"] = [
+                    self.format_error(e) for e in execution_result.errors
+                ]
+
+            if execution_result.errors and any(
+                not getattr(e, "path", None) for e in execution_result.errors
+            ):
+                status_code = 400
+            else:
+                response["data"] = execution_result.data
+
+            if execution_result.extensions:
+                response["extensions"] = execution_result.extensions
+
+            if self.batch:
+                response["id"] = id
+                response["status"] = status_code
+
+            result = self.json_encode(request, response, pretty=show_graphiql)
+        else:
+            result = None
+
+        return result, status_code
+
+    def get_extensions(self, request, data):
+        extensions = request.GET.get('extensions') or data.get('extensions')
+        if extensions and isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        return extensions
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        prepared = self.prepare_operation(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        if not isinstance(prepared, PreparedOperation):
+            return prepared
+
+        with trace_operation(operation_label(prepared, operation_name)) as trace:
+            result = self.execute_document(
+                request, prepared.schema, prepared.document, prepared.operation_ast,
+                variables, operation_name
+            )
+        self.finish_operation(request, prepared)
+        return self.add_extensions(result, prepared.extensions, trace)
+
+    def prepare_operation(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        """
+        Everything before execution: persisted query lookup, the document
+        cache and the cost check. Returns a PreparedOperation, or the
+        ExecutionResult (or None for GraphiQL) to respond with instead.
+        """
+        try:
+            query = resolve_persisted_query(query, self.get_extensions(request, data))
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+
+        document, errors = document_cache.get(
+            schema, query, self.validation_rules, graphene_settings.MAX_VALIDATION_ERRORS
+        )
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        extensions = {}
+        if operation_ast is not None and getattr(settings, 'CRM_QUERY_COST_ENABLED', True):
+            try:
+                extensions['cost'] = check_cost(request, schema, document, operation_ast, variables)
+            except QueryCostError as e:
+                return ExecutionResult(errors=[e])
+
+        return PreparedOperation(schema, document, operation_ast, extensions)
+
+    def finish_operation(self, request, prepared):
+        if is_mutation(prepared.operation_ast):
+            request.crm_wrote = True
+            reset_loaders(self.get_context(request))
+
+    def add_extensions(self, result, extensions, trace):
+        if trace is not None and getattr(settings, 'CRM_TRACING_IN_RESPONSE', False):
+            extensions = {**extensions, 'tracing': trace.as_extension()}
+        if extensions:
+            result.extensions = {**(result.extensions or {}), **extensions}
+        return result
+
+    def get_execute_options(self, request, variables, operation_name):
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+        return execute_options
+
+    def is_atomic_mutation(self, operation_ast):
+        return (
+            is_mutation(operation_ast)
+            and (
+                graphene_settings.ATOMIC_MUTATIONS is True
+                or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+            )
+        )
+
+    def database_reads(self, request, operation_ast):
+        if is_query(operation_ast) and not pinned_to_primary(request):
+            return read_from_replica()
+        return nullcontext()
+
+    def is_cacheable(self, operation_ast):
+        return (
+            operation_ast is not None
+            and operation_ast.operation == OperationType.QUERY
+            and getattr(settings, "CRM_RESPONSE_CACHE_ENABLED", True)
+        )
+
+    def execute_document(self, request, schema, document, operation_ast, variables, operation_name):
+        try:
+            execute_options = self.get_execute_options(request, variables, operation_name)
+
+            if self.is_atomic_mutation(operation_ast):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            with self.database_reads(request, operation_ast):
+                if self.is_cacheable(operation_ast):
+                    return self.execute_cached(schema, document, variables, operation_name, execute_options)
+                return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+    def lookup_response(self, schema, document, variables, operation_name):
+        """
+        Return (key, tag versions, cached data or None)
+        """
+        tags = sorted(model_tag(model) for model in document_models(schema, document))
+        key = response_key(document, operation_name, variables, using=current_replica.get())
+        # Read tag versions first so a write during execution is never masked
+        versions = tag_versions(tags)
+        return key, versions, get_response(key, versions)
+
+    def execute_cached(self, schema, document, variables, operation_name, execute_options):
+        key, versions, data = self.lookup_response(schema, document, variables, operation_name)
+        if data is not None:
+            return ExecutionResult(data=data)
+
+        result = execute(schema, document, **execute_options)
+        if not result.errors:
+            set_response(key, versions, result.data, using=current_replica.get())
+        return result
+
+
+class AsyncCRMGraphQLView(CRMGraphQLView):
+    """
+    CRMGraphQLView for ASGI servers (see alx_backend_graphql/asgi.py).
+
+    Operations execute on the event loop with `crm_async` set on the
+    context, so the CRM resolvers use the async ORM or hop to Django's sync
+    thread (see crm.aio) and independent root fields resolve concurrently.
+    A request waiting on the database no longer holds a worker thread.
+
+    In a batch, consecutive queries run concurrently. A mutation waits for
+    the operations before it and runs alone, so the operations after it
+    see its writes.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # GraphQLView has no get()/post() for Django to detect as async
+        view = super().as_view(**initkwargs)
+        markcoroutinefunction(view)
+        return view
+
+    @method_decorator(ensure_csrf_cookie)
+    async def dispatch(self, request, *args, **kwargs):
+        request.crm_async = True
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["GET", "POST"], "GraphQL only supports GET and POST requests."
+                    )
+                )
+
+            data = self.parse_body(request)
+            show_graphiql = self.graphiql and self.can_display_graphiql(request, data)
+
+            if show_graphiql:
+                # Renders the GraphiQL page; nothing is executed
+                return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+            if self.batch:
+                responses = await self.aget_batch_responses(request, data)
+                result = "[{}]".format(
+                    ",".join([response[0] for response in responses])
+                )
+                status_code = (
+                    responses
+                    and max(responses, key=lambda response: response[1])[1]
+                    or 200
+                )
+            else:
+                result, status_code = await self.aget_response(request, data, show_graphiql)
+
+            response = HttpResponse(
+                status=status_code, content=result, content_type="application/json"
+            )
+            if getattr(request, 'crm_wrote', False):
+                pin_to_primary(response)
+            return response
+
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(
+                request, {"errors": [self.format_error(e)]}
+            )
+            return response
+
+    async def aget_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = await self.aexecute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        return self.build_response(request, execution_result, id, show_graphiql)
+
+    async def aget_batch_responses(self, request, data):
+        # Prepared up front, in order, so the batch cost is charged in order
+        operations = []
+        for entry in data:
+            query, variables, operation_name, id = self.get_graphql_params(request, entry)
+            prepared = self.prepare_operation(request, entry, query, variables, operation_name)
+            operations.append((prepared, variables, operation_name, id))
+
+        results, queries = [], []
+        for prepared, variables, operation_name, id in operations:
+            run = self.aexecute_prepared(request, prepared, variables, operation_name)
+            if isinstance(prepared, PreparedOperation) and is_mutation(prepared.operation_ast):
+                results.extend(await asyncio.gather(*queries))
+                queries = []
+                results.append(await run)
+            else:
+                queries.append(run)
+        results.extend(await asyncio.gather(*queries))
+
+        return [
+            self.build_response(request, result, operation[3])
+            for operation, result in zip(operations, results)
+        ]
+
+    async def aexecute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        # Parsing, validation and the cost check are CPU and cache work only
+        prepared = self.prepare_operation(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        return await self.aexecute_prepared(request, prepared, variables, operation_name)
+
+    async def aexecute_prepared(self, request, prepared, variables, operation_name):
+        if not isinstance(prepared, PreparedOperation):
+            return prepared
+
+        with trace_operation(operation_label(prepared, operation_name)) as trace:
+            result = await self.aexecute_document(
+                request, prepared.schema, prepared.document, prepared.operation_ast,
+                variables, operation_name
+            )
+        self.finish_operation(request, prepared)
+        return self.add_extensions(result, prepared.extensions, trace)
+
+    async def aexecute_document(self, request, schema, document, operation_ast, variables, operation_name):
+        if self.is_atomic_mutation(operation_ast):
+            # Django transactions are sync only: run the mutation the sync way
+            request.crm_async = False
+            try:
+                return await sync_to_async(self.execute_document)(
+                    request, schema, document, operation_ast, variables, operation_name
+                )
+            finally:
+                request.crm_async = True
+
+        try:
+            execute_options = self.get_execute_options(request, variables, operation_name)
+
+            # Concurrent operations of a batch each run in their own task, so
+            # each keeps its own replica
+            with self.database_reads(request, operation_ast):
+                if self.is_cacheable(operation_ast):
+                    key, versions, data = self.lookup_response(schema, document, variables, operation_name)
+                    if data is not None:
+                        return ExecutionResult(data=data)
+                    result = await self.aexecute(schema, document, execute_options)
+                    if not result.errors:
+                        set_response(key, versions, result.data, using=current_replica.get())
+                    return result
+
+                return await self.aexecute(schema, document, execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+    async def aexecute(self, schema, document, execute_options):
+        result = execute(schema, document, **execute_options)
+        if isawaitable(result):
+            result = await result
+        return result
+
+
+def is_mutation(operation_ast):
+    return operation_ast is not None and operation_ast.operation == OperationType.MUTATION
+
+
+def is_query(operation_ast):
+    return operation_ast is not None and operation_ast.operation == OperationType.QUERY
+
+
+def operation_label(prepared, operation_name):
+    operation_ast = prepared.operation_ast
+    if operation_ast is not None and operation_ast.name:
+        return operation_ast.name.value
+    return operation_name
+
+
+def metrics(request):
+    """
+    GraphQL operation and resolver histograms in the Prometheus text format
+    """
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@permission_required('crm.view_order', raise_exception=True)
+def export_orders_view(request):
+    """
+    Stream orders as NDJSON or CSV (?format=csv). The other query parameters
+    are OrderFilter filters, e.g. ?order_date_gte=2024-01-01&product_name=laptop
+    """
+    filters = request.GET.copy()
+    format = filters.pop('format', ['ndjson'])[-1]
+    using = None if pinned_to_primary(request) else choose_replica()
+    try:
+        lines = export_orders(filters, format=format, using=using)
+    except Exception as e:
+        return JsonResponse({'errors': [str(e)]}, status=400)
+
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[format])
+    response['Content-Disposition'] = f'attachment; filename="orders.{format}"'
+    return response